@@ -5,6 +5,8 @@
 #   "playwright",
 #   "playwright-stealth",
 #   "python-dotenv",
+#   "orjson",
+#   "brotli",
 # ]
 # ///
 """
@@ -21,16 +23,27 @@ Usage:
     # session is now ready for API calls to ihcm.adp.com
 """
 
+import atexit
 import base64
+import copy
+import email.utils
+import functools
 import getpass
 import json
 import os
+import re
 import shutil
 import subprocess
 import sys
+import tempfile
+import threading
 import time
+from collections import deque
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 # Load .env file if python-dotenv is available
 try:
@@ -41,36 +54,83 @@ except ImportError:
 
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 from urllib3.util.retry import Retry
 
-# Try to import playwright and playwright-stealth - required for browser auth
+# orjson is optional - a faster drop-in for reading/writing cache files and
+# parsing API responses
 try:
-    from playwright.sync_api import Browser, BrowserContext, Playwright, sync_playwright
-    from playwright.sync_api import TimeoutError as PlaywrightTimeout
-    from playwright_stealth import Stealth
-    PLAYWRIGHT_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def fast_json_dumps(obj, indent: bool = False) -> bytes:
+    """
+    Serialize obj to UTF-8 JSON bytes, using orjson when available. Compact
+    by default; indent pretty-prints with two spaces.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS if indent else 0)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def fast_json_loads(data: bytes | str):
+    """Parse JSON bytes or text, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# httpx (with the http2 extra) is optional - only needed for create_session_h2
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
 except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
-    # Define dummy types for type hints when playwright not installed
-    Browser = type(None)
-    BrowserContext = type(None)
-    Playwright = type(None)
+    HTTPX_AVAILABLE = False
+
+# Playwright is imported lazily by the browser-based flows, so callers that only
+# use requests-based auth or a cached session don't pay its import cost
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, BrowserContext, Locator, Page, Playwright
 
 
 # Debug log file - captures full request/response details
 DEBUG_LOG_FILE = Path('auth_debug.log')
 
 
+def _noop(*args, **kwargs):
+    pass
+
+
 class DebugLogger:
-    """Logs all HTTP request/response details to a file for debugging."""
+    """
+    Logs all HTTP request/response details to a file for debugging.
+
+    While disabled, the log_* methods are shadowed by instance-level no-ops,
+    so calls cost nothing beyond the call itself. enable() removes the
+    shadows to expose the real implementations.
+    """
+
+    _LOG_METHODS = ('log_section', 'log_cookies', 'log_request', 'log_response', 'log_redirect_history')
 
     def __init__(self, filepath: Path = DEBUG_LOG_FILE):
         self.filepath = filepath
         self.enabled = False
         self._file = None
+        self._silence()
+
+    def _silence(self):
+        for name in self._LOG_METHODS:
+            setattr(self, name, _noop)
 
     def enable(self):
         self.enabled = True
+        for name in self._LOG_METHODS:
+            self.__dict__.pop(name, None)
         self._file = open(self.filepath, 'w', encoding='utf-8')
         self._write('=== Authentication Debug Log ===')
         self._write(f'Started: {datetime.now().isoformat()}')
@@ -78,37 +138,33 @@ class DebugLogger:
 
     def disable(self):
         if self._file:
+            # Writes are block-buffered; closing flushes them to disk
             self._file.close()
             self._file = None
         self.enabled = False
+        self._silence()
 
     def _write(self, text: str):
         if self._file:
             self._file.write(text + '\n')
-            self._file.flush()
 
     def log_section(self, title: str):
-        if not self.enabled:
-            return
         self._write('')
         self._write('=' * 80)
         self._write(f'  {title}')
         self._write('=' * 80)
 
     def log_cookies(self, session: requests.Session, label: str = 'Current Cookies'):
-        if not self.enabled:
-            return
         self._write(f'\n--- {label} ---')
         for cookie in session.cookies:
+            value = cookie.value or ''
             self._write(f'  {cookie.name}:')
-            self._write(f'    value: {cookie.value[:100]}{"..." if len(cookie.value) > 100 else ""}')
+            self._write(f'    value: {value[:100]}{"..." if len(value) > 100 else ""}')
             self._write(f'    domain: {cookie.domain}')
             self._write(f'    path: {cookie.path}')
             self._write(f'    secure: {cookie.secure}')
 
-    def log_request(self, method: str, url: str, headers: dict, body=None):
-        if not self.enabled:
-            return
+    def log_request(self, method: str, url: str, headers: Mapping, body=None):
         self._write(f'\n>>> REQUEST: {method} {url}')
         self._write('--- Request Headers ---')
         for k, v in headers.items():
@@ -131,8 +187,6 @@ class DebugLogger:
                 self._write(str(body)[:500])
 
     def log_response(self, response: requests.Response):
-        if not self.enabled:
-            return
         self._write(f'\n<<< RESPONSE: {response.status_code} {response.reason}')
         self._write(f'    Final URL: {response.url}')
         self._write('--- Response Headers ---')
@@ -154,8 +208,6 @@ class DebugLogger:
             self._write(response.text[:2000] if response.text else '[empty]')
 
     def log_redirect_history(self, response: requests.Response):
-        if not self.enabled:
-            return
         if response.history:
             self._write('\n--- Redirect History ---')
             for i, r in enumerate(response.history):
@@ -178,6 +230,47 @@ IHCM_PRODUCT_ID = 'b376f1f2-a35a-025b-e053-f282530b8ccb'
 # 1Password item name for credentials (can be overridden via .env or environment variable)
 ONEPASSWORD_ITEM = os.environ.get('ONEPASSWORD_ITEM', 'ADP IHCM')
 
+# Look up credentials in the macOS keychain before 1Password (opt-in via .env or environment variable)
+USE_KEYCHAIN = os.environ.get('IHCM_USE_KEYCHAIN', '').lower() in ('1', 'true', 'yes')
+
+
+_JWT_EXP_RE = re.compile(rb'"exp"\s*:\s*(\d+)')
+
+
+@functools.lru_cache(maxsize=8)
+def _jwt_exp(bearer_token: str) -> int | None:
+    """
+    Return the exp claim of a JWT (without verifying it), or None if absent.
+
+    Only the exp claim is needed, so the decoded payload is scanned for it
+    rather than parsed in full, and the result is memoized per token since
+    the same cached token is checked repeatedly. Raises ValueError for a
+    malformed token.
+    """
+    # JWT format: header.payload.signature
+    parts = bearer_token.encode('ascii').split(b'.')
+    if len(parts) != 3:
+        raise ValueError('Not a JWT')
+
+    # Decode the payload (middle part), adding padding as needed
+    payload_b64 = parts[1]
+    payload = base64.urlsafe_b64decode(payload_b64 + b'=' * (-len(payload_b64) % 4))
+    if not payload.lstrip().startswith(b'{'):
+        raise ValueError('JWT payload is not a JSON object')
+
+    match = _JWT_EXP_RE.search(payload)
+    return int(match.group(1)) if match else None
+
+
+# Background session cache writes still in flight, flushed before exit
+_pending_cache_writes: set[threading.Thread] = set()
+
+
+@atexit.register
+def _flush_cache_writes() -> None:
+    for writer in list(_pending_cache_writes):
+        writer.join()
+
 
 class SessionCache:
     """
@@ -190,20 +283,63 @@ class SessionCache:
     CACHE_DIR = Path.home() / '.cache' / 'ihcm'
     CACHE_FILE = CACHE_DIR / 'session.json'
 
+    # Persistent browser profile, so SSO cookies survive between Playwright runs
+    PROFILE_DIR = CACHE_DIR / 'profile'
+
+    # Login form selectors that matched last time (kept apart from the session,
+    # which is cleared exactly when the login form is needed again)
+    SELECTORS_FILE = CACHE_DIR / 'selectors.json'
+
+    # Cheap endpoint used to confirm the server still accepts a cached session
+    VALIDATION_URL = f'{IHCM_BASE_URL}/whrmux/webapi/api/data/me/home'
+
+    # After a network error, skip re-probing for this long
+    ERROR_TTL_SECONDS = 60
+
     def __init__(self, verbose: bool = True):
         self.verbose = verbose
+        self._data: dict | None = None
+        self._writer: threading.Thread | None = None
 
     def _log(self, message: str):
         if self.verbose:
             print(message)
 
+    def _wait_for_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def _write_atomic(self, data: dict) -> None:
+        # mkstemp creates the file 0600, so the tokens are never world-readable,
+        # and the rename means readers never see a half-written cache
+        fd, tmp_path = tempfile.mkstemp(dir=self.CACHE_DIR, prefix='.session.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(fast_json_dumps(data))
+            os.replace(tmp_path, self.CACHE_FILE)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _write(self, data: dict) -> None:
+        self._wait_for_writer()
+        self._write_atomic(data)
+
     def save(
         self,
         bearer_token: str,
         cookies: list[dict],
         xsrf_token: str | None,
+        background: bool = False,
     ) -> None:
-        """Save session state to the cache file."""
+        """
+        Save session state to the cache file.
+
+        With background the file is written on a separate thread so the caller
+        can start using the session straight away; this instance already holds
+        the data, and pending writes are flushed at exit.
+        """
         self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
         cache_data = {
@@ -214,17 +350,32 @@ class SessionCache:
             'last_validated': datetime.now().isoformat(),
         }
 
-        self.CACHE_FILE.write_text(json.dumps(cache_data, indent=2))
-        self.CACHE_FILE.chmod(0o600)  # Restrict permissions since it contains auth tokens
+        self._data = cache_data
+        if background:
+            self._wait_for_writer()
+            writer = threading.Thread(target=self._write_in_background, args=(cache_data,), daemon=True)
+            _pending_cache_writes.add(writer)
+            self._writer = writer
+            writer.start()
+        else:
+            self._write(cache_data)
         self._log(f'  Session cached to {self.CACHE_FILE}')
 
+    def _write_in_background(self, data: dict) -> None:
+        try:
+            self._write_atomic(data)
+        except OSError as e:
+            self._log(f'  Warning: could not write session cache: {e}')
+        finally:
+            _pending_cache_writes.discard(threading.current_thread())
+
     def load(self) -> dict | None:
         """Load cached session data if it exists and has required fields."""
         if not self.CACHE_FILE.exists():
             return None
 
         try:
-            data = json.loads(self.CACHE_FILE.read_text())
+            data = fast_json_loads(self.CACHE_FILE.read_bytes())
         except (json.JSONDecodeError, OSError):
             self._log('  Cache file corrupted, will re-authenticate')
             self.clear()
@@ -236,66 +387,85 @@ class SessionCache:
             self.clear()
             return None
 
+        self._data = data
         return data
 
     def update_last_validated(self) -> None:
         """Update the last_validated timestamp in the cache."""
-        data = self.load()
+        # Reuse the copy parsed by load() rather than re-reading the file
+        data = self._data if self._data is not None else self.load()
         if data:
             data['last_validated'] = datetime.now().isoformat()
-            self.CACHE_FILE.write_text(json.dumps(data, indent=2))
+            data.pop('validation_failed_at', None)
+            self._write(data)
+
+    def revalidate(self, session: requests.Session) -> bool:
+        """
+        Confirm the server still accepts a cached session with a single request.
+
+        Uses HEAD, falling back to a streamed GET whose body is never read if
+        the endpoint doesn't allow HEAD. Any response other than 200 (including
+        a redirect to the login page) clears the cache. Network errors are
+        recorded in the cache so that runs within ERROR_TTL_SECONDS skip the
+        probe instead of retrying an unreachable endpoint.
+        """
+        failed_at = (self._data or {}).get('validation_failed_at')
+        if failed_at and time.time() - failed_at < self.ERROR_TTL_SECONDS:
+            self._log('  Session validation failed recently, skipping check')
+            return False
+
+        try:
+            # Only the status matters, so avoid downloading the body
+            response = session.head(self.VALIDATION_URL, timeout=5, allow_redirects=False)
+            if response.status_code in (405, 501):
+                with session.get(self.VALIDATION_URL, timeout=5, allow_redirects=False, stream=True) as response:
+                    pass
+        except requests.RequestException as e:
+            self._log(f'  Session validation failed: {e}')
+            if self._data is not None:
+                self._data['validation_failed_at'] = time.time()
+                self._write(self._data)
+            return False
+
+        if response.status_code == 200:
+            return True
+
+        self._log(f'  Session validation failed: HTTP {response.status_code}')
+        self.clear()
+        return False
 
-    def clear(self) -> None:
-        """Delete the cache file."""
+    def clear(self, include_profile: bool = False) -> None:
+        """Delete the cache file, and optionally the persistent browser profile."""
+        self._wait_for_writer()
+        self._data = None
         if self.CACHE_FILE.exists():
             self.CACHE_FILE.unlink()
             self._log('  Session cache cleared')
+        if include_profile and self.PROFILE_DIR.exists():
+            shutil.rmtree(self.PROFILE_DIR)
+            self._log('  Browser profile cleared')
 
-    def is_token_expired(self, bearer_token: str, buffer_minutes: int = 5) -> bool:
+    def token_seconds_remaining(self, bearer_token: str) -> float | None:
         """
-        Check if a JWT bearer token is expired or will expire soon.
+        Seconds until the JWT's exp claim, read locally without a network call.
 
-        Decodes the JWT payload (without verification) to read the exp claim.
-        Returns True if the token will expire within buffer_minutes.
+        Returns None if the token can't be decoded or has no exp claim.
         """
         try:
-            # JWT format: header.payload.signature
-            parts = bearer_token.split('.')
-            if len(parts) != 3:
-                return True
-
-            # Decode the payload (middle part), adding padding as needed
-            payload_b64 = parts[1]
-            padding = 4 - len(payload_b64) % 4
-            if padding != 4:
-                payload_b64 += '=' * padding
-
-            payload_json = base64.urlsafe_b64decode(payload_b64)
-            payload = json.loads(payload_json)
-
-            exp_timestamp = payload.get('exp')
-            if not exp_timestamp:
-                # No expiry claim, assume it's valid but we'll validate with API
-                return False
-
-            # Check if token expires within buffer_minutes
-            exp_datetime = datetime.fromtimestamp(exp_timestamp)
-            buffer_seconds = buffer_minutes * 60
-            now = datetime.now()
-
-            if exp_datetime.timestamp() - now.timestamp() < buffer_seconds:
-                self._log(f'  Token expires at {exp_datetime}, within {buffer_minutes}min buffer')
-                return True
-
-            return False
-
-        except (ValueError, KeyError, json.JSONDecodeError):
-            # If we can't decode the token, consider it potentially expired
-            return True
+            exp_timestamp = _jwt_exp(bearer_token)
+        except ValueError:
+            return None
+        return exp_timestamp - time.time() if exp_timestamp else None
 
 
+@functools.lru_cache(maxsize=1)
 def is_1password_available() -> bool:
-    """Check if the 1Password CLI (op) is installed and available."""
+    """
+    Check if the 1Password CLI (op) is installed and available.
+
+    The PATH lookup is done once per process; call is_1password_available.cache_clear()
+    to re-check.
+    """
     return shutil.which('op') is not None
 
 
@@ -316,30 +486,72 @@ def get_credentials_from_prompt() -> tuple[str, str]:
     return username, password
 
 
+def get_credentials_from_keychain(item_name: str = ONEPASSWORD_ITEM) -> tuple[str, str] | None:
+    """
+    Retrieve username and password from a macOS keychain generic password item.
+
+    The item's service name must match item_name, with the username stored as the
+    account. Returns None if not on macOS or no matching item exists.
+    """
+    if sys.platform != 'darwin' or not shutil.which('security'):
+        return None
+
+    attrs_result = subprocess.run(
+        ['security', 'find-generic-password', '-s', item_name],
+        capture_output=True,
+        text=True,
+    )
+    if attrs_result.returncode != 0:
+        return None
+
+    match = re.search(r'"acct"<blob>="(.*)"', attrs_result.stdout)
+    if not match:
+        return None
+
+    password_result = subprocess.run(
+        ['security', 'find-generic-password', '-s', item_name, '-w'],
+        capture_output=True,
+        text=True,
+    )
+    if password_result.returncode != 0:
+        return None
+
+    username = match.group(1)
+    password = password_result.stdout.rstrip('\n')
+    if not username or not password:
+        return None
+
+    return username, password
+
+
+@functools.lru_cache(maxsize=8)
 def get_credentials_from_1password(item_name: str = ONEPASSWORD_ITEM) -> tuple[str, str]:
     """
     Retrieve username and password from 1Password using the op CLI.
 
+    Results are memoized per item for the life of the process, so repeated
+    authentications don't spawn op again.
+
     Returns (username, password) tuple.
     """
     try:
-        # Get username
-        username_result = subprocess.run(
-            ['op', 'item', 'get', item_name, '--fields', 'username'],
+        # Fetch the whole item in one call (requires --reveal for secret fields)
+        result = subprocess.run(
+            ['op', 'item', 'get', item_name, '--format=json', '--reveal'],
             capture_output=True,
             text=True,
             check=True,
         )
-        username = username_result.stdout.strip()
+        item = json.loads(result.stdout)
 
-        # Get password (requires --reveal for secret fields)
-        password_result = subprocess.run(
-            ['op', 'item', 'get', item_name, '--fields', 'password', '--reveal'],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        password = password_result.stdout.strip()
+        values = {}
+        for field in item.get('fields', []):
+            for key in (field.get('id'), field.get('label')):
+                if key in ('username', 'password') and key not in values:
+                    values[key] = (field.get('value') or '').strip()
+
+        username = values.get('username', '')
+        password = values.get('password', '')
 
         if not username or not password:
             raise ValueError(f'Empty credentials retrieved from 1Password item "{item_name}"')
@@ -351,6 +563,8 @@ def get_credentials_from_1password(item_name: str = ONEPASSWORD_ITEM) -> tuple[s
             f'Failed to get credentials from 1Password: {e.stderr}\n'
             f'Make sure you are signed into 1Password CLI (run: op signin)'
         ) from e
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f'Unexpected output from 1Password CLI for item "{item_name}": {e}') from e
     except FileNotFoundError as e:
         raise RuntimeError(
             '1Password CLI (op) not found. Please install it:\n'
@@ -366,8 +580,17 @@ def get_credentials(item_name: str = ONEPASSWORD_ITEM, verbose: bool = True) ->
     - Users with 1Password CLI configured get seamless authentication
     - Users without 1Password can still use the scripts by entering credentials manually
 
+    If IHCM_USE_KEYCHAIN is set, a matching macOS keychain item is tried first.
+
     Returns (username, password) tuple.
     """
+    if USE_KEYCHAIN:
+        credentials = get_credentials_from_keychain(item_name)
+        if credentials:
+            if verbose:
+                print(f'Using credentials from macOS keychain ({item_name})')
+            return credentials
+
     if is_1password_available():
         if verbose:
             print(f'Getting credentials from 1Password ({item_name})...')
@@ -385,27 +608,72 @@ def get_credentials(item_name: str = ONEPASSWORD_ITEM, verbose: bool = True) ->
         return get_credentials_from_prompt()
 
 
-def create_session() -> requests.Session:
-    """Create a requests session with retry logic and connection pooling."""
+# Shared by every session: retry on rate limiting and transient server errors,
+# waiting as long as a Retry-After header asks
+_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=['HEAD', 'GET', 'POST'],
+    respect_retry_after_header=True,
+)
+
+# For sessions paced by RateLimiter: 429s are returned to the caller rather
+# than retried here, so the limiter sees them and backs off every worker.
+# urllib3 would otherwise still retry any 429 that carries Retry-After.
+# A 5xx that outlasts the retries is returned too, not raised as RetryError,
+# so callers can react to the status (e.g. retry with a smaller page).
+_PACED_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=['HEAD', 'GET', 'POST'],
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+
+
+class _SharedAdapter(HTTPAdapter):
+    """An HTTPAdapter that remembers the pool size and retry policy it was built with."""
+
+    def __init__(self, pool_size: int, paced: bool):
+        super().__init__(
+            max_retries=_PACED_RETRY if paced else _RETRY,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=False,
+        )
+        self.pool_size = pool_size
+        self.paced = paced
+
+
+@functools.cache
+def _shared_adapter(pool_size: int, paced: bool = False) -> _SharedAdapter:
+    """One adapter (and so one urllib3 pool manager) per pool size and policy, shared across sessions."""
+    return _SharedAdapter(pool_size, paced)
+
+
+def create_session(pool_size: int = 32) -> requests.Session:
+    """
+    Create a requests session with retry logic and connection pooling.
+
+    pool_size bounds the keep-alive connections per host; size it to at least
+    the number of threads that will share the session. Sessions with the same
+    pool_size share an adapter, so connections opened by one (e.g. during cache
+    validation) are reused by the next.
+    """
     session = requests.Session()
 
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=['POST', 'GET'],
-    )
-    adapter = HTTPAdapter(
-        max_retries=retry_strategy,
-        pool_connections=10,
-        pool_maxsize=10,
-    )
+    adapter = _shared_adapter(pool_size)
     session.mount('https://', adapter)
+    session.mount('http://', adapter)
 
     # Set common headers matching browser behavior
     session.headers.update({
         'Accept': 'application/json, text/plain, */*',
         'Accept-Language': 'en-GB,en;q=0.9',
+        # urllib3 lists br (and zstd) only when a decoder is installed
+        'Accept-Encoding': ACCEPT_ENCODING,
         'Content-Type': 'application/json',
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
         'Origin': AUTH_BASE_URL,
@@ -416,11 +684,243 @@ def create_session() -> requests.Session:
     return session
 
 
+def ensure_pool_size(session: requests.Session, pool_size: int) -> None:
+    """
+    Make sure session keeps at least pool_size connections per host alive, so
+    that many worker threads don't tear down and re-handshake connections.
+    """
+    adapter = session.get_adapter('https://')
+    paced = isinstance(adapter, _SharedAdapter) and adapter.paced
+    if isinstance(adapter, _SharedAdapter) and adapter.pool_size >= pool_size:
+        return
+    larger = _shared_adapter(pool_size, paced)
+    session.mount('https://', larger)
+    session.mount('http://', larger)
+
+
+def use_rate_limiter(session: requests.Session, pool_size: int) -> None:
+    """
+    Prepare a session whose requests are paced by a RateLimiter: keep at
+    least pool_size connections per host alive, and hand 429 responses back
+    to the caller instead of retrying them in urllib3 - the limiter then
+    pauses every worker for the Retry-After and halves its concurrency, and
+    the caller decides whether to retry.
+    """
+    adapter = session.get_adapter('https://')
+    if isinstance(adapter, _SharedAdapter):
+        pool_size = max(pool_size, adapter.pool_size)
+    paced = _shared_adapter(pool_size, paced=True)
+    session.mount('https://', paced)
+    session.mount('http://', paced)
+
+
+class ThreadSessions:
+    """
+    Give each worker thread its own copy of an authenticated session.
+
+    The EMEASMSESSION cookie rotates on every response, so workers sharing one
+    cookie jar store their new cookies in whatever order the responses land
+    and can leave the jar holding a stale one. A thread's copy shares the
+    session's headers, adapters and connection pools but keeps its own jar;
+    once the workers are done, merge() hands the jar of the thread that heard
+    from the server last back to the session.
+    """
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Bumped by merge(), so threads start again from the merged cookies
+        self._generation = 0
+        self._latest: requests.Session | None = None
+
+    def get(self) -> requests.Session:
+        """Return the calling thread's copy of the session."""
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.session = self._copy()
+            local.generation = self._generation
+        return local.session
+
+    def _copy(self) -> requests.Session:
+        clone = copy.copy(self.session)
+        clone.headers = self.session.headers.copy()
+        with self._lock:
+            clone.cookies = self.session.cookies.copy()
+        clone.hooks = {event: list(hooks) for event, hooks in self.session.hooks.items()}
+        clone.hooks['response'].append(functools.partial(self._heard_from, clone))
+        return clone
+
+    def _heard_from(self, clone: requests.Session, response: requests.Response, *args, **kwargs) -> None:
+        with self._lock:
+            self._latest = clone
+
+    def merge(self) -> None:
+        """
+        Copy the newest cookies back into the session. Call it once the
+        workers are done; threads copy the session afresh on their next get().
+        """
+        with self._lock:
+            if self._latest is not None:
+                self.session.cookies.update(self._latest.cookies)
+                self._latest = None
+            self._generation += 1
+
+
+def create_session_h2(session: requests.Session, max_connections: int = 32) -> 'httpx.Client':
+    """
+    Build an HTTP/2 httpx client carrying the headers and cookies of an
+    authenticated requests session.
+
+    Concurrent callers multiplex over a single TLS connection instead of each
+    holding their own. Requires: uv pip install 'httpx[http2]'
+    """
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError(
+            'httpx is not installed. Install with:\n'
+            "  uv pip install 'httpx[http2]'"
+        )
+
+    client = httpx.Client(
+        http2=True,
+        headers=dict(session.headers),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max(1, max_connections // 2),
+        ),
+        timeout=30,
+    )
+    for cookie in session.cookies:
+        client.cookies.set(cookie.name, cookie.value or '', domain=cookie.domain, path=cookie.path)
+
+    return client
+
+
+def sync_cookies_from_h2(client: 'httpx.Client', session: requests.Session) -> None:
+    """
+    Copy an httpx client's cookies back into the requests session it was
+    built from. The session cookie rotates on every response, so without
+    this the session is left holding a stale one.
+    """
+    for cookie in client.cookies.jar:
+        session.cookies.set(cookie.name, cookie.value or '', domain=cookie.domain, path=cookie.path)
+
+
+def looks_like_html(response: requests.Response) -> bool:
+    """True if the body is an HTML page (typically the login redirect) rather than JSON."""
+    # Only the first bytes are inspected so large JSON bodies are never decoded
+    head = response.content[:16].lstrip().lower()
+    return head.startswith((b'<!doctype', b'<html'))
+
+
+def header_seconds(value: str | None) -> float | None:
+    """
+    Parse a Retry-After style header: delta seconds or an HTTP date. Reset
+    headers that carry an epoch timestamp are converted to a delay as well.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    # Large values are absolute epoch timestamps rather than delays
+    return seconds - time.time() if seconds > 1_000_000_000 else seconds
+
+
+class RateLimiter:
+    """
+    Paces API requests from the server's own signals instead of a fixed sleep.
+
+    Call wait() before each request and update(response) after it (None if the
+    request raised). Requests go out immediately while the server has headroom;
+    Retry-After and X-Rate-Limit-Remaining/Reset (or RateLimit-*) headers pause
+    all callers until the indicated time. Concurrency follows AIMD: halved on a
+    429 or 5xx, grown by about 0.5 per clean round trip, within
+    [min_concurrency, max_concurrency]. requests_per_second optionally caps the
+    send rate over a sliding one-second window.
+
+    Thread-safe, so one limiter can be shared by a pool of workers.
+    """
+
+    ALPHA = 0.5  # Additive increase per window of clean responses
+    BETA = 0.5  # Multiplicative decrease on 429/5xx
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        requests_per_second: float | None = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.requests_per_second = requests_per_second
+        self.concurrency = float(self.max_concurrency)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._sent: deque[float] = deque()
+
+    def _delay(self, now: float) -> float:
+        delay = self._paused_until - now
+        if self.requests_per_second:
+            while self._sent and now - self._sent[0] >= 1.0:
+                self._sent.popleft()
+            if len(self._sent) >= self.requests_per_second:
+                delay = max(delay, self._sent[0] + 1.0 - now)
+        return delay
+
+    def wait(self) -> None:
+        """Block until a request may be sent, and count it as in flight."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                delay = self._delay(now)
+                if delay <= 0 and self._in_flight < int(self.concurrency):
+                    self._in_flight += 1
+                    if self.requests_per_second:
+                        self._sent.append(now)
+                    return
+                self._cond.wait(timeout=delay if delay > 0 else None)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all callers for the given number of seconds."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def update(self, response: requests.Response | None) -> None:
+        """Record the outcome of a request started with wait()."""
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            now = time.monotonic()
+
+            if response is None or response.status_code == 429 or response.status_code >= 500:
+                self.concurrency = max(self.min_concurrency, self.concurrency * self.BETA)
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + self.ALPHA / self.concurrency)
+
+            if response is not None:
+                headers = response.headers
+                retry_after = header_seconds(headers.get('Retry-After'))
+                if retry_after is None:
+                    remaining = headers.get('X-Rate-Limit-Remaining', headers.get('RateLimit-Remaining'))
+                    if remaining is not None and remaining.strip() == '0':
+                        retry_after = header_seconds(headers.get('X-Rate-Limit-Reset', headers.get('RateLimit-Reset')))
+                if retry_after and retry_after > 0:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+
+            self._cond.notify_all()
+
+
 def get_csrf_token(session: requests.Session) -> str:
     """Fetch CSRF token from the auth server (returned as a cookie)."""
     debug_log.log_section('GET CSRF TOKEN')
     url = f'{AUTH_BASE_URL}/csrf'
-    debug_log.log_request('GET', url, dict(session.headers))
+    debug_log.log_request('GET', url, session.headers)
 
     response = session.get(url)
 
@@ -452,7 +952,7 @@ def start_signin(session: requests.Session, csrf_token: str) -> str:
     }
 
     url = f'{AUTH_BASE_URL}/api/sign-in-service/v1/sign-in.start'
-    debug_log.log_request('POST', url, dict(session.headers), payload)
+    debug_log.log_request('POST', url, session.headers, payload)
 
     response = session.post(url, json=payload)
 
@@ -482,7 +982,7 @@ def identify_account(session: requests.Session, username: str, session_token: st
     }
 
     url = f'{AUTH_BASE_URL}/api/sign-in-service/v1/sign-in.account.identify'
-    debug_log.log_request('POST', url, dict(session.headers), payload)
+    debug_log.log_request('POST', url, session.headers, payload)
 
     response = session.post(url, json=payload)
 
@@ -516,7 +1016,7 @@ def respond_to_password_challenge(
     response with redirectUrl, or an empty response with session cookies set.
     """
     debug_log.log_section('PASSWORD CHALLENGE')
-    payload = {
+    payload: dict[str, Any] = {
         'response': {
             'type': 'PASSWORD_VERIFICATION_RESPONSE',
             'password': password,
@@ -526,7 +1026,7 @@ def respond_to_password_challenge(
     }
 
     url = f'{AUTH_BASE_URL}/api/sign-in-service/v1/sign-in.challenge.respond'
-    debug_log.log_request('POST', url, dict(session.headers), payload)
+    debug_log.log_request('POST', url, session.headers, payload)
 
     response = session.post(url, json=payload)
 
@@ -567,7 +1067,7 @@ def get_ihcm_bearer_token(session: requests.Session) -> str:
     debug_log.log_cookies(session, 'Cookies before token request')
 
     url = f'{IHCM_BASE_URL}/whrmux/webapi/token'
-    debug_log.log_request('POST', url, dict(session.headers))
+    debug_log.log_request('POST', url, session.headers)
 
     response = session.post(url)
 
@@ -587,7 +1087,7 @@ def get_ihcm_bearer_token(session: requests.Session) -> str:
         raise RuntimeError('Token endpoint returned empty response')
 
     # Check if we got redirected to login page (HTML response)
-    if response.text.strip().startswith('<!doctype') or response.text.strip().startswith('<html'):
+    if looks_like_html(response):
         raise RuntimeError(
             f'Token endpoint returned HTML (login page). '
             f'Final URL: {response.url}. Session may not be valid for iHCM.'
@@ -623,7 +1123,7 @@ def complete_sso_authorization(session: requests.Session) -> None:
         f'&TARGET=-SM-{IHCM_BASE_URL}/whrmux/web/me/home'
     )
 
-    debug_log.log_request('GET', authorize_url, dict(session.headers))
+    debug_log.log_request('GET', authorize_url, session.headers)
 
     response = session.get(authorize_url, allow_redirects=True)
 
@@ -632,47 +1132,65 @@ def complete_sso_authorization(session: requests.Session) -> None:
     debug_log.log_cookies(session, 'Cookies after authorization')
 
 
+def _use_ihcm_headers(session: requests.Session) -> None:
+    """Point Origin/Referer at iHCM and pick up the current XSRF token cookie."""
+    session.headers['Origin'] = IHCM_BASE_URL
+    session.headers['Referer'] = f'{IHCM_BASE_URL}/whrmux/web/'
+
+    # XSRF token may have been updated during redirects
+    xsrf_token = session.cookies.get('XSRF-TOKEN')
+    if xsrf_token:
+        session.headers['X-XSRF-TOKEN'] = xsrf_token
+
+
 def establish_ihcm_session(session: requests.Session, redirect_url: str = None) -> None:
     """
     Follow the redirect to iHCM and establish the session.
 
     This involves:
-    1. Complete SSO authorization to establish SiteMinder session
-    2. Exchange the session cookie for a JWT bearer token via /webapi/token
+    1. Exchange the session cookie for a JWT bearer token via /webapi/token
+    2. If that is refused, complete SSO authorization to establish the SiteMinder
+       session, load the iHCM home page, and retry the exchange
     """
     debug_log.log_section('ESTABLISH iHCM SESSION')
 
-    # First, complete the SSO authorization flow
-    complete_sso_authorization(session)
+    bearer_token = None
 
-    # Update headers for iHCM domain
-    session.headers['Origin'] = IHCM_BASE_URL
-    session.headers['Referer'] = f'{IHCM_BASE_URL}/whrmux/web/'
+    # The challenge response often sets a session cookie that is already accepted
+    # by the token endpoint, which saves the authorization redirect chain and the
+    # home page download
+    if session.cookies.get('k8Ksj346'):
+        _use_ihcm_headers(session)
+        try:
+            bearer_token = get_ihcm_bearer_token(session)
+            debug_log.log_section('BEARER TOKEN OBTAINED DIRECTLY (SSO authorization skipped)')
+        except (RuntimeError, requests.HTTPError):
+            debug_log.log_section('DIRECT TOKEN EXCHANGE REFUSED - falling back to SSO authorization')
 
-    # Update XSRF token from cookies (may have been updated during redirect)
-    xsrf_token = session.cookies.get('XSRF-TOKEN')
-    if xsrf_token:
-        session.headers['X-XSRF-TOKEN'] = xsrf_token
+    if not bearer_token:
+        # Complete the SSO authorization flow
+        complete_sso_authorization(session)
+        _use_ihcm_headers(session)
 
-    # Verify we have the session cookie
-    if not session.cookies.get('k8Ksj346'):
-        raise RuntimeError(
-            'Session cookie (k8Ksj346) not set. Authentication may have failed.'
-        )
+        # Verify we have the session cookie
+        if not session.cookies.get('k8Ksj346'):
+            raise RuntimeError(
+                'Session cookie (k8Ksj346) not set. Authentication may have failed.'
+            )
 
-    # Now try to access iHCM to see if SSO is working
-    debug_log.log_section('ACCESS iHCM HOME')
-    home_url = f'{IHCM_BASE_URL}/whrmux/web/me/home'
-    debug_log.log_request('GET', home_url, dict(session.headers))
+        # Now try to access iHCM to see if SSO is working
+        debug_log.log_section('ACCESS iHCM HOME')
+        home_url = f'{IHCM_BASE_URL}/whrmux/web/me/home'
+        debug_log.log_request('GET', home_url, session.headers)
 
-    response = session.get(home_url, allow_redirects=True)
+        response = session.get(home_url, allow_redirects=True)
 
-    debug_log.log_response(response)
-    debug_log.log_redirect_history(response)
-    debug_log.log_cookies(session, 'Cookies after accessing iHCM home')
+        debug_log.log_response(response)
+        debug_log.log_redirect_history(response)
+        debug_log.log_cookies(session, 'Cookies after accessing iHCM home')
 
-    # Exchange session cookie for bearer token - this is the key step the browser does
-    bearer_token = get_ihcm_bearer_token(session)
+        # Exchange session cookie for bearer token - this is the key step the browser does
+        bearer_token = get_ihcm_bearer_token(session)
 
     # Configure session for API calls with the bearer token
     session.headers.update({
@@ -686,7 +1204,12 @@ def establish_ihcm_session(session: requests.Session, redirect_url: str = None)
 
 
 def authenticate(
-    username: str, password: str, verbose: bool = True, debug: bool = False
+    username: str,
+    password: str,
+    verbose: bool = True,
+    debug: bool = False,
+    session: requests.Session | None = None,
+    csrf_token: str | None = None,
 ) -> requests.Session:
     """
     Perform full authentication flow to ADP iHCM.
@@ -696,6 +1219,8 @@ def authenticate(
         password: ADP password
         verbose: Print progress messages to stdout
         debug: Write detailed debug log to auth_debug.log
+        session: Session that csrf_token was fetched with, if already done
+        csrf_token: Prefetched CSRF token (see _prefetch_csrf_token)
 
     Returns an authenticated requests.Session ready for API calls.
     """
@@ -707,12 +1232,12 @@ def authenticate(
         if verbose:
             print('Authenticating to ADP iHCM...')
 
-        session = create_session()
-
-        # Step 1: Get CSRF token
-        if verbose:
-            print('  Getting CSRF token...')
-        csrf_token = get_csrf_token(session)
+        # Step 1: Get CSRF token (unless it was prefetched)
+        if session is None or csrf_token is None:
+            session = create_session()
+            if verbose:
+                print('  Getting CSRF token...')
+            csrf_token = get_csrf_token(session)
 
         # Step 2: Start sign-in flow
         if verbose:
@@ -746,229 +1271,733 @@ def authenticate(
             print(f'  Debug log written to: {DEBUG_LOG_FILE}')
 
 
+def _prefetch_csrf_token() -> tuple[requests.Session, str]:
+    """Create a session and fetch its CSRF token (run while credentials are retrieved)."""
+    session = create_session()
+    return session, get_csrf_token(session)
+
+
 def create_authenticated_session(
     item_name: str = ONEPASSWORD_ITEM,
     verbose: bool = True,
     debug: bool = False,
+    use_cache: bool = True,
 ) -> requests.Session:
     """
     Create an authenticated session using credentials from 1Password or manual entry.
 
-    This is the main entry point for other scripts.
+    This is the main entry point for other scripts. When use_cache is True (default),
+    a previously cached session is reused if it still validates, skipping the
+    sign-in flow entirely.
 
     Args:
         item_name: Name of the 1Password item containing credentials
         verbose: Whether to print progress messages
         debug: Whether to write detailed debug log to auth_debug.log
+        use_cache: Whether to attempt using a cached session (default: True)
 
     Returns:
         An authenticated requests.Session ready for iHCM API calls
     """
-    username, password = get_credentials(item_name, verbose=verbose)
+    cache = SessionCache(verbose=verbose)
+
+    if use_cache:
+        session = _load_cached_session(cache, verbose)
+        if session:
+            return session
+
+    # The CSRF fetch doesn't depend on the credentials, so overlap it with the
+    # op/keychain lookup. Skipped in debug mode so the request still gets logged.
+    session, csrf_token = None, None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prefetch = None if debug else executor.submit(_prefetch_csrf_token)
+        username, password = get_credentials(item_name, verbose=verbose)
+        if prefetch:
+            try:
+                session, csrf_token = prefetch.result()
+            except (requests.RequestException, RuntimeError):
+                pass  # authenticate() fetches it again and reports any error
 
     if verbose:
         print(f'  Username: {username}')
 
-    return authenticate(username, password, verbose=verbose, debug=debug)
-
+    session = authenticate(
+        username, password, verbose=verbose, debug=debug, session=session, csrf_token=csrf_token
+    )
 
-def authenticate_with_playwright(
-    username: str,
-    password: str,
-    verbose: bool = True,
-    headless: bool = True,
-    timeout: int = 60000,
-    browser_type: str = 'chromium',
-) -> requests.Session:
-    """
-    Authenticate to iHCM using Playwright browser automation.
+    if use_cache:
+        _cache_session(cache, session)
 
-    This approach handles the full SSO flow including JavaScript-based token exchange
-    that cannot be replicated with Python requests alone.
+    return session
 
-    Args:
-        username: ADP username (email)
-        password: ADP password
-        verbose: Print progress messages
-        headless: Run browser in headless mode
-        timeout: Timeout in milliseconds for page operations
-        browser_type: Browser to use ('chromium', 'firefox', or 'webkit')
 
-    Returns:
-        An authenticated requests.Session with bearer token and cookies
-    """
-    if not PLAYWRIGHT_AVAILABLE:
-        raise RuntimeError(
-            'Playwright and playwright-stealth are required for browser-based authentication.\n'
-            'Install with: uv pip install playwright playwright-stealth && uv run playwright install chromium'
-        )
+TOKEN_URL_FRAGMENT = '/whrmux/webapi/token'
 
-    if verbose:
-        print(f'Starting browser-based authentication ({browser_type})...')
 
-    with sync_playwright() as p:
-        browser_launcher = getattr(p, browser_type, p.chromium)
-        # Use slow_mo to add delays between Playwright actions - helps with browser stability
-        browser = browser_launcher.launch(headless=headless, slow_mo=100)
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-            viewport={'width': 1280, 'height': 800},
-        )
-        page = context.new_page()
+# Idle browsers kept per thread between authentications (0 disables reuse)
+BROWSER_POOL_SIZE = int(os.environ.get('IHCM_BROWSER_POOL_SIZE', '2'))
 
-        # Apply stealth mode to evade bot detection
-        if verbose:
-            print('  Applying stealth mode...')
-        Stealth().apply_stealth_sync(page)
+_BROWSERS = frozenset({'chromium', 'firefox', 'webkit'})
 
-        try:
-            # Navigate to iHCM - let the full redirect chain complete
-            if verbose:
-                print('  Navigating to iHCM (following SSO redirects)...')
 
-            page.goto(
-                f'{IHCM_BASE_URL}/whrmux/web/me/home',
-                wait_until='networkidle',
-                timeout=timeout,
-            )
+def _check_browser_type(browser_type: str) -> None:
+    # Fail fast on a typo rather than launching the wrong browser
+    if browser_type not in _BROWSERS:
+        raise ValueError(f'Unknown browser_type {browser_type!r}; expected one of {", ".join(sorted(_BROWSERS))}')
 
-            # Wait for page to fully stabilize after navigation
-            time.sleep(10)
 
-            # Wait for username field to appear - this is the definitive sign we're on the login page
-            if verbose:
-                print('  Waiting for login form...')
+def _close_quietly(closeable) -> None:
+    try:
+        closeable.close()
+    except Exception:
+        pass  # Browser may already be gone
 
-            username_input = page.wait_for_selector(
-                'input[name="userId"], input[name="user"], input[type="email"], input[type="text"]',
-                state='visible',
-                timeout=timeout,
-            )
 
-            if verbose:
-                print('  Entering username...')
-            username_input.fill(username)
+class _BrowserPool:
+    """
+    Keeps launched browsers (and the Playwright driver) alive between
+    authentications, so a re-auth only pays for a new context.
 
-            # Click Next and wait for password field to appear
-            if verbose:
-                print('  Clicking Next...')
+    Sync Playwright objects can only be used from the thread that created them,
+    so there is one pool per thread (see _browser_pool()).
+    """
 
-            # Give the page a moment to react to username input
-            time.sleep(2)
+    def __init__(self, size: int):
+        self.size = size
+        self.owner = threading.get_ident()
+        self._playwright: Playwright | None = None
+        self._idle: dict[tuple, list] = {}
+        self._leased: dict = {}
 
+    def playwright(self) -> 'Playwright':
+        """Return this thread's Playwright instance, starting it on first use."""
+        if self._playwright is None:
             try:
-                # Try multiple selectors for the Next button
-                next_btn = page.locator('text=Next').first
-                next_btn.wait_for(state='visible', timeout=timeout)
-                next_btn.click()
-            except PlaywrightTimeout:
-                # Save debug screenshot on failure
-                screenshot_path = Path('auth_failure_next_btn.png')
-                page.screenshot(path=str(screenshot_path))
-                if verbose:
-                    print(f'  Debug screenshot saved to {screenshot_path}')
-                    print(f'  Current URL: {page.url}')
-                raise
-
-            # Wait for page transition after clicking Next
-            time.sleep(5)
-
-            # Wait for password field - this confirms we've moved to the password step
-            if verbose:
-                print('  Waiting for password field...')
+                from playwright.sync_api import sync_playwright
+            except ImportError as e:
+                raise _missing_playwright_error() from e
+            self._playwright = sync_playwright().start()
+        return self._playwright
+
+    def acquire(self, browser_type: str, headless: bool, slow_mo_ms: int = 0) -> 'Browser':
+        """Return an idle browser with matching launch options, or launch one."""
+        key = (browser_type, headless, slow_mo_ms)
+        idle = self._idle.get(key, [])
+        while idle:
+            browser = idle.pop()
+            if browser.is_connected():
+                self._leased[browser] = key
+                return browser
+
+        p = self.playwright()
+        browser_launcher = getattr(p, browser_type)
+        browser = browser_launcher.launch(headless=headless, slow_mo=slow_mo_ms)
+        self._leased[browser] = key
+        return browser
+
+    def release(self, browser: 'Browser') -> None:
+        """Return a browser to the pool; crashed or surplus browsers are closed."""
+        key = self._leased.pop(browser, None)
+        idle = self._idle.setdefault(key, [])
+        if key is None or len(idle) >= self.size or not browser.is_connected():
+            _close_quietly(browser)
+        else:
+            idle.append(browser)
+
+    def close(self) -> None:
+        """Close every browser and stop Playwright."""
+        for browsers in self._idle.values():
+            for browser in browsers:
+                _close_quietly(browser)
+        self._idle.clear()
+        for browser in list(self._leased):
+            _close_quietly(browser)
+        self._leased.clear()
+        if self._playwright:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
 
-            password_input = page.wait_for_selector(
-                'input[type="password"]',
-                state='visible',
-                timeout=timeout,
-            )
 
+_browser_pool_local = threading.local()
+_browser_pools: list[_BrowserPool] = []
+_browser_pools_lock = threading.Lock()
+
+
+def _browser_pool() -> _BrowserPool:
+    """Return the calling thread's browser pool."""
+    pool = getattr(_browser_pool_local, 'pool', None)
+    if pool is None:
+        pool = _BrowserPool(BROWSER_POOL_SIZE)
+        _browser_pool_local.pool = pool
+        with _browser_pools_lock:
+            _browser_pools.append(pool)
+    return pool
+
+
+@atexit.register
+def _close_browser_pools() -> None:
+    # Only the owning thread can drive a pool; the drivers of any others exit with the process
+    with _browser_pools_lock:
+        pools = [pool for pool in _browser_pools if pool.owner == threading.get_ident()]
+    for pool in pools:
+        pool.close()
+
+
+def _missing_playwright_error() -> RuntimeError:
+    return RuntimeError(
+        'Playwright and playwright-stealth are required for browser-based authentication.\n'
+        'Install with: uv pip install playwright playwright-stealth && uv run playwright install chromium'
+    )
+
+
+# Images, fonts and media on the SSO pages are decoration - the login form is
+# plain inputs - so the auth contexts abort them instead of downloading them
+BLOCKED_RESOURCES = '**/*.{png,jpg,jpeg,gif,webp,svg,ico,woff,woff2,ttf,otf,mp4,webm}'
+
+
+def _launch_browser_context(
+    browser_type: str,
+    headless: bool,
+    user_data_dir: Path | None = None,
+    slow_mo_ms: int = 0,
+) -> tuple['Browser | None', 'BrowserContext']:
+    """
+    Open a fresh context on a pooled browser and return (browser, context).
+
+    With user_data_dir a persistent context is launched instead and browser is
+    None - closing the context shuts that browser down. Pass both to
+    _close_browser_context() when done.
+    """
+    pool = _browser_pool()
+    user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
+
+    if user_data_dir:
+        # The profile holds SSO cookies, so keep it private to the user
+        user_data_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+        p = pool.playwright()
+        browser_launcher = getattr(p, browser_type)
+        context = browser_launcher.launch_persistent_context(
+            str(user_data_dir),
+            headless=headless,
+            slow_mo=slow_mo_ms,
+            user_agent=user_agent,
+            viewport={'width': 1280, 'height': 800},
+        )
+        context.route(BLOCKED_RESOURCES, lambda route: route.abort())
+        return None, context
+
+    browser = pool.acquire(browser_type, headless, slow_mo_ms)
+    context = browser.new_context(
+        user_agent=user_agent,
+        viewport={'width': 1280, 'height': 800},
+    )
+    context.route(BLOCKED_RESOURCES, lambda route: route.abort())
+    return browser, context
+
+
+def _prewarm_browser(browser_type: str, headless: bool, driver_only: bool) -> None:
+    """
+    Start the Playwright driver, plus a pooled browser unless driver_only (the
+    auth will launch its own, e.g. for a persistent profile), so the following
+    authentication doesn't wait for them. Failures are left for the
+    authentication itself to report.
+    """
+    try:
+        pool = _browser_pool()
+        if driver_only or pool.size == 0:
+            pool.playwright()
+        else:
+            pool.release(pool.acquire(browser_type, headless))
+    except Exception:
+        pass
+
+
+def _get_credentials_while_prewarming(
+    item_name: str,
+    verbose: bool,
+    browser_type: str,
+    headless: bool,
+    driver_only: bool,
+) -> tuple[str, str]:
+    """
+    Fetch credentials on a worker thread while the browser starts on this one.
+
+    Playwright objects are bound to the thread that creates them, so the browser
+    has to be the part that stays on the calling thread. When credentials will
+    come from an interactive prompt, nothing is overlapped.
+    """
+    if not (USE_KEYCHAIN or is_1password_available()):
+        return get_credentials(item_name, verbose=verbose)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        credentials = executor.submit(get_credentials, item_name, verbose)
+        _prewarm_browser(browser_type, headless, driver_only)
+        return credentials.result()
+
+
+def _close_browser_context(browser: 'Browser | None', context: 'BrowserContext') -> None:
+    """Close a context from _launch_browser_context() and return its browser to the pool."""
+    _close_quietly(context)
+    if browser is not None:
+        _browser_pool().release(browser)
+
+
+@functools.cache
+def _stealth_script() -> str:
+    """The playwright-stealth init script, generated once per process."""
+    try:
+        from playwright_stealth import Stealth
+    except ImportError as e:
+        raise _missing_playwright_error() from e
+    return Stealth().script_payload
+
+
+def _should_apply_stealth(stealth: bool | None, headless: bool, user_data_dir: Path | None) -> bool:
+    """
+    Decide whether to inject playwright-stealth.
+
+    Stealth only matters for cold headless contexts; a headed browser or a
+    profile that has already been through the login looks like a real user.
+    IHCM_STEALTH=1/0 overrides that default when no explicit choice is passed.
+    """
+    if stealth is not None:
+        return stealth
+    env_stealth = os.environ.get('IHCM_STEALTH')
+    if env_stealth in ('0', '1'):
+        return env_stealth == '1'
+    if not headless:
+        return False
+    return not (user_data_dir and user_data_dir.exists() and any(user_data_dir.iterdir()))
+
+
+USERNAME_SELECTORS = (
+    'input[name="userId"]',
+    'input[name="user"]',
+    'input[type="email"]',
+    'input[type="text"]',
+)
+USERNAME_SELECTOR = ', '.join(USERNAME_SELECTORS)
+PASSWORD_SELECTOR = 'input[type="password"]'
+SUBMIT_SELECTOR = 'button[type="submit"], button:has-text("Sign In"), button:has-text("Login")'
+# Where the sign-in page reports a rejected username or password
+LOGIN_ERROR_SELECTOR = '[role="alert"], sdf-alert[status="error"], .error-message'
+
+# Resolves to {token} once the SPA has stored the bearer token, or to {error}
+# while the sign-in page shows an error; null keeps a wait_for_function polling
+_LOGIN_OUTCOME_JS = f'''() => {{
+    const token = sessionStorage.getItem("iHcmBearerToken");
+    if (token) return {{token}};
+    if (location.origin === "{IHCM_BASE_URL}") return null;
+    const shown = Array.from(document.querySelectorAll('{LOGIN_ERROR_SELECTOR}'))
+        .find((el) => el.getClientRects().length > 0 && el.textContent.trim());
+    return shown ? {{error: shown.textContent.trim().slice(0, 200)}} : null;
+}}'''
+
+
+def _ms_left(deadline: float) -> int:
+    """Milliseconds until a time.monotonic() deadline, as a Playwright timeout (0 would mean none)."""
+    return max(1, int((deadline - time.monotonic()) * 1000))
+
+
+def _raise_login_error(outcome: dict | None) -> None:
+    """Fail fast when the sign-in page shows an error, rather than waiting out the deadline."""
+    if outcome and outcome.get('error'):
+        raise RuntimeError(f'Sign-in failed: {outcome["error"]}')
+
+
+def _submit_and_capture_token(page: 'Page', password_input: 'Locator', deadline: float) -> str | None:
+    """
+    Submit the login form and capture the bearer token from the browser's own
+    call to the iHCM token endpoint, rather than waiting for sessionStorage.
+
+    Raises RuntimeError as soon as the sign-in page shows an error (e.g. a
+    wrong password). Returns None if the token response wasn't seen before
+    deadline (or couldn't be read), in which case the caller falls back to
+    sessionStorage.
+    """
+    from playwright.sync_api import Error as PlaywrightError
+
+    token_responses: list = []
+
+    def on_response(response) -> None:
+        if TOKEN_URL_FRAGMENT in response.url and response.status == 200:
+            token_responses.append(response)
+
+    page.on('response', on_response)
+    try:
+        submit_btn = page.locator(SUBMIT_SELECTOR).first
+        if submit_btn.count():
+            submit_btn.click()
+        else:
+            password_input.press('Enter')
+
+        while not token_responses:
+            if time.monotonic() >= deadline:
+                return None
+            try:
+                _raise_login_error(page.evaluate(_LOGIN_OUTCOME_JS))
+            except PlaywrightError:
+                pass  # Mid-navigation; check again on the next round
+            page.wait_for_timeout(200)
+
+        try:
+            return token_responses[0].json().get('access_token')
+        except Exception:
+            # Body unavailable (page navigated away) or not JSON
+            return None
+    finally:
+        page.remove_listener('response', on_response)
+
+
+def _load_known_selectors() -> dict:
+    try:
+        return fast_json_loads(SessionCache.SELECTORS_FILE.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_known_selectors(selectors: dict) -> None:
+    try:
+        SessionCache.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        SessionCache.SELECTORS_FILE.write_bytes(fast_json_dumps(selectors))
+    except OSError:
+        pass  # Only an optimisation
+
+
+def _find_username_input(page: 'Page', timeout: int) -> 'Locator':
+    """
+    Wait for the username field, trying the selector that matched last run first.
+
+    Falls back to the compound selector (and records which part of it matched)
+    if the known selector doesn't show up within half a second.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    known = _load_known_selectors()
+    if known.get('username'):
+        known_input = page.locator(known['username']).first
+        try:
+            known_input.wait_for(state='visible', timeout=500)
+            return known_input
+        except PlaywrightTimeout:
+            pass
+
+    username_input = page.locator(USERNAME_SELECTOR).first
+    username_input.wait_for(state='visible', timeout=timeout)
+    for selector in USERNAME_SELECTORS:
+        if username_input.evaluate('(el, selector) => el.matches(selector)', selector):
+            if selector != known.get('username'):
+                _save_known_selectors({**known, 'username': selector})
+            break
+    return username_input
+
+
+def _existing_bearer_token(page: 'Page', timeout: int) -> str | None:
+    """
+    Wait for either the login form or an iHCM bearer token, whichever comes first.
+
+    With a persistent browser profile the SSO cookies are often still valid, in
+    which case the SPA loads straight into iHCM and no login form is shown.
+    Returns the bearer token in that case, or None if the login form appeared.
+
+    Only a visible username input on a page outside iHCM counts as the login
+    form - the iHCM SPA has text inputs of its own, which would otherwise end
+    the wait before the token is stored.
+    """
+    # Resolves to {token} once either is present; null keeps it polling
+    handle = page.wait_for_function(
+        f'''() => {{
+            const token = sessionStorage.getItem("iHcmBearerToken");
+            if (token) return {{token}};
+            if (location.origin === "{IHCM_BASE_URL}") return null;
+            const inputs = document.querySelectorAll('{USERNAME_SELECTOR}');
+            const visible = Array.from(inputs).some((el) => el.getClientRects().length > 0);
+            return visible ? {{token: null}} : null;
+        }}''',
+        timeout=timeout,
+    )
+    return handle.json_value()['token']
+
+
+def _sign_in_via_form(
+    page: 'Page',
+    username: str,
+    password: str,
+    verbose: bool,
+    deadline: float,
+) -> str | None:
+    """
+    Fill in the username/password steps of the ADP login form and submit it.
+
+    Returns the bearer token if it was captured from the token response, or
+    None if the caller needs to fall back to polling sessionStorage.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    # Wait for username field to appear - this is the definitive sign we're on the login page
+    if verbose:
+        print('  Waiting for login form...')
+
+    username_input = _find_username_input(page, _ms_left(deadline))
+
+    if verbose:
+        print('  Entering username...')
+    username_input.fill(username)
+
+    # Click Next and wait for password field to appear
+    if verbose:
+        print('  Clicking Next...')
+
+    try:
+        # Prefer the accessible button, fall back to any element labelled Next
+        next_btn = page.get_by_role('button', name='Next').or_(page.locator('text=Next')).first
+        next_btn.wait_for(state='visible', timeout=_ms_left(deadline))
+        next_btn.click()
+    except PlaywrightTimeout:
+        # Save debug screenshot on failure
+        screenshot_path = Path('auth_failure_next_btn.png')
+        page.screenshot(path=str(screenshot_path))
+        if verbose:
+            print(f'  Debug screenshot saved to {screenshot_path}')
+            print(f'  Current URL: {page.url}')
+        raise
+
+    # Wait for password field - this confirms we've moved to the password step
+    if verbose:
+        print('  Waiting for password field...')
+
+    password_input = page.locator(PASSWORD_SELECTOR).first
+    password_input.wait_for(state='visible', timeout=_ms_left(deadline))
+
+    if verbose:
+        print('  Entering password...')
+    password_input.fill(password)
+
+    # Submit and wait for navigation back to iHCM
+    if verbose:
+        print('  Submitting login...')
+
+    return _submit_and_capture_token(page, password_input, deadline)
+
+
+def _wait_for_stored_token(page: 'Page', deadline: float) -> str | None:
+    """
+    Wait for the redirect back to iHCM and for the SPA to put the bearer token
+    in sessionStorage. Returns None if it doesn't appear before deadline, and
+    raises RuntimeError as soon as the sign-in page shows an error instead.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    # Poll inside the browser rather than round-tripping page.evaluate each second;
+    # the resolved handle already holds the outcome, so no second read is needed
+    try:
+        handle = page.wait_for_function(_LOGIN_OUTCOME_JS, timeout=_ms_left(deadline), polling=200)
+    except PlaywrightTimeout:
+        return None
+    outcome = handle.json_value()
+    _raise_login_error(outcome)
+    return outcome['token']
+
+
+def _run_auth_flow(
+    page: 'Page',
+    context: 'BrowserContext',
+    username: str,
+    password: str,
+    verbose: bool,
+    timeout: int,
+    browser_type: str,
+) -> tuple[str, list, str | None]:
+    """
+    Drive the SSO login in page and return (bearer_token, cookies, xsrf_token).
+
+    Shared by authenticate_with_playwright() and
+    _authenticate_with_browser_kept_alive(), which only differ in what they
+    do with the browser afterwards. Playwright failures are re-raised as
+    RuntimeError; the caller owns (and closes) the context.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    try:
+        # Navigate to iHCM - let the full redirect chain complete
+        if verbose:
+            print('  Navigating to iHCM (following SSO redirects)...')
+
+        page.goto(
+            f'{IHCM_BASE_URL}/whrmux/web/me/home',
+            wait_until='domcontentloaded',
+            timeout=timeout,
+        )
+
+        # One budget for the whole sign-in, so a wrong password or a changed
+        # form fails within `timeout` rather than after every stage's own wait
+        deadline = time.monotonic() + timeout / 1000
+        bearer_token = _existing_bearer_token(page, _ms_left(deadline))
+        if bearer_token:
             if verbose:
-                print('  Entering password...')
-            password_input.fill(password)
+                print('  Already signed in (persistent browser profile)')
+        else:
+            bearer_token = _sign_in_via_form(page, username, password, verbose, deadline)
 
-            # Submit and wait for navigation back to iHCM
+        if not bearer_token:
+            # Didn't see the token exchange - wait for the SPA to store it instead
             if verbose:
-                print('  Submitting login...')
+                print('  Waiting for authentication to complete...')
+            bearer_token = _wait_for_stored_token(page, deadline)
 
-            submit_btn = page.query_selector(
-                'button[type="submit"], button:has-text("Sign In"), button:has-text("Login")'
+        if not bearer_token:
+            raise RuntimeError(
+                f'Login did not complete successfully. Final URL: {page.url}'
             )
-            if submit_btn:
-                submit_btn.click()
-            else:
-                password_input.press('Enter')
 
-            # Wait for login to process and redirect
-            time.sleep(10)
+        if verbose:
+            print('  Bearer token acquired!')
 
-            # Wait for successful redirect to iHCM by checking for the bearer token
-            if verbose:
-                print('  Waiting for authentication to complete...')
+        # Extract all cookies from browser context
+        if verbose:
+            print('  Extracting cookies...')
+        cookies = context.cookies()
 
-            # Poll for bearer token in sessionStorage - this is the definitive sign of success
-            bearer_token = None
-            for _ in range(30):  # Up to 30 seconds
-                time.sleep(1)
-                try:
-                    bearer_token = page.evaluate('() => sessionStorage.getItem("iHcmBearerToken")')
-                    if bearer_token:
-                        break
-                except Exception:
-                    # Page might still be navigating
-                    pass
+        xsrf_token = next((c['value'] for c in cookies if c['name'] == 'XSRF-TOKEN'), None)
 
-            if not bearer_token:
-                raise RuntimeError(
-                    f'Login did not complete successfully. Final URL: {page.url}'
-                )
+        if verbose:
+            print(f'  Extracted {len(cookies)} cookies')
 
-            if verbose:
-                print('  Bearer token acquired!')
+    except PlaywrightTimeout as e:
+        raise RuntimeError(f'Authentication timed out: {e}') from e
+    except Exception as e:
+        error_msg = str(e)
+        if 'Page crashed' in error_msg or 'browser has disconnected' in error_msg.lower():
+            raise RuntimeError(
+                f'Browser crashed during authentication. This may indicate the browser '
+                f'is not properly installed. Try running:\n'
+                f'  uv run playwright install {browser_type}\n\n'
+                f'Original error: {e}'
+            ) from e
+        raise RuntimeError(f'Authentication failed: {e}') from e
 
-            # Extract all cookies from browser context
-            if verbose:
-                print('  Extracting cookies...')
-            cookies = context.cookies()
+    return bearer_token, cookies, xsrf_token
 
-            xsrf_token = None
-            for cookie in cookies:
-                if cookie['name'] == 'XSRF-TOKEN':
-                    xsrf_token = cookie['value']
-                    break
 
-            if verbose:
-                print(f'  Extracted {len(cookies)} cookies')
-
-        except PlaywrightTimeout as e:
-            raise RuntimeError(f'Authentication timed out: {e}') from e
-        except Exception as e:
-            error_msg = str(e)
-            if 'Page crashed' in error_msg or 'browser has disconnected' in error_msg.lower():
-                raise RuntimeError(
-                    f'Browser crashed during authentication. This may indicate the browser '
-                    f'is not properly installed. Try running:\n'
-                    f'  uv run playwright install {browser_type}\n\n'
-                    f'Original error: {e}'
-                ) from e
-            raise RuntimeError(f'Authentication failed: {e}') from e
-        finally:
-            browser.close()
+def authenticate_with_playwright(
+    username: str,
+    password: str,
+    verbose: bool = True,
+    headless: bool = True,
+    timeout: int = 60000,
+    browser_type: str = 'chromium',
+    user_data_dir: Path | None = None,
+    stealth: bool | None = None,
+    slow_mo_ms: int = 0,
+) -> requests.Session:
+    """
+    Authenticate to iHCM using Playwright browser automation.
+
+    This approach handles the full SSO flow including JavaScript-based token exchange
+    that cannot be replicated with Python requests alone.
+
+    Args:
+        username: ADP username (email)
+        password: ADP password
+        verbose: Print progress messages
+        headless: Run browser in headless mode
+        timeout: Timeout in milliseconds for page operations
+        browser_type: Browser to use ('chromium', 'firefox', or 'webkit')
+        user_data_dir: Persistent browser profile directory; when its SSO cookies
+            are still valid the login form is skipped entirely
+        stealth: Apply playwright-stealth (default: only for headless runs without
+            a warm profile)
+        slow_mo_ms: Delay between Playwright actions, for debugging
+
+    Returns:
+        An authenticated requests.Session with bearer token and cookies
+    """
+    _check_browser_type(browser_type)
+
+    if verbose:
+        print(f'Starting browser-based authentication ({browser_type})...')
+
+    apply_stealth = _should_apply_stealth(stealth, headless, user_data_dir)
+
+    browser, context = _launch_browser_context(browser_type, headless, user_data_dir, slow_mo_ms)
+
+    # Apply stealth mode to evade bot detection, on the context so that every
+    # page of the SSO flow gets it
+    if apply_stealth:
+        if verbose:
+            print('  Applying stealth mode...')
+        context.add_init_script(_stealth_script())
+    page = context.new_page()
+
+    try:
+        bearer_token, cookies, xsrf_token = _run_auth_flow(
+            page, context, username, password, verbose, timeout, browser_type
+        )
+    finally:
+        _close_browser_context(browser, context)
 
     # Build a requests session with the extracted auth
     if verbose:
         print('  Configuring session...')
 
-    session = create_session()
+    session = _api_session(bearer_token, cookies, xsrf_token)
 
-    # Add cookies to session
-    for cookie in cookies:
-        session.cookies.set(
-            cookie['name'],
-            cookie['value'],
-            domain=cookie.get('domain', ''),
-            path=cookie.get('path', '/'),
-        )
+    if verbose:
+        print('  Browser authentication complete!')
+
+    return session
+
+
+def _cookies_to_records(jar: requests.cookies.RequestsCookieJar) -> list[dict]:
+    """
+    Serialize a cookie jar to JSON-friendly records for the session cache.
+
+    Domain and path are kept (unlike dict_from_cookiejar) because SSO sets
+    same-named cookies on both the auth and iHCM hosts.
+    """
+    return [
+        {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path}
+        for c in jar
+    ]
+
+
+@functools.lru_cache(maxsize=4)
+def _build_jar(cookie_tuples: tuple[tuple[str, str, str, str], ...]) -> requests.cookies.RequestsCookieJar:
+    jar = requests.cookies.RequestsCookieJar()
+    for name, value, domain, path in cookie_tuples:
+        jar.set_cookie(requests.cookies.create_cookie(name, value, domain=domain, path=path))
+    return jar
+
+
+def _jar_from_records(records: Sequence[Mapping[str, Any]]) -> requests.cookies.RequestsCookieJar:
+    """
+    Build a cookie jar from cached records (or Playwright context.cookies()).
+
+    Jars are memoized on the cookie contents, so rebuilding the same cached
+    session within a process skips the per-cookie work. Callers get their own
+    copy since sessions mutate their jar.
+    """
+    cookie_tuples = tuple(
+        (record['name'], record['value'], record.get('domain', ''), record.get('path', '/'))
+        for record in records
+    )
+    return _build_jar(cookie_tuples).copy()
+
+
+def _api_session(
+    bearer_token: str,
+    cookie_records: Sequence[Mapping[str, Any]],
+    xsrf_token: str | None = None,
+) -> requests.Session:
+    """
+    Build a requests session for the iHCM API from a bearer token and cookie
+    records. The jar is built in one go rather than merged cookie by cookie.
+    """
+    session = create_session()
+    session.cookies = _jar_from_records(cookie_records)
 
     # Configure headers for API calls
     session.headers.update({
@@ -983,9 +2012,6 @@ def authenticate_with_playwright(
     if xsrf_token:
         session.headers['X-XSRF-TOKEN'] = xsrf_token
 
-    if verbose:
-        print('  Browser authentication complete!')
-
     return session
 
 
@@ -994,50 +2020,72 @@ def _reconstruct_session_from_cache(
     verbose: bool = True,
 ) -> requests.Session:
     """Reconstruct a requests.Session from cached authentication data."""
-    session = create_session()
+    return _api_session(cache_data['bearer_token'], cache_data['cookies'], cache_data.get('xsrf_token'))
 
-    # Add cookies to session
-    for cookie in cache_data['cookies']:
-        session.cookies.set(
-            cookie['name'],
-            cookie['value'],
-            domain=cookie.get('domain', ''),
-            path=cookie.get('path', '/'),
-        )
-
-    # Configure headers for API calls
-    session.headers.update({
-        'Accept': 'application/json, text/plain, */*',
-        'Content-Type': 'application/json;charset=UTF-8',
-        'X-Requested-With': 'XMLHttpRequest',
-        'Origin': IHCM_BASE_URL,
-        'Referer': f'{IHCM_BASE_URL}/whrmux/web/me/directory/',
-        'Authorization': f'Bearer {cache_data["bearer_token"]}',
-    })
-
-    if cache_data.get('xsrf_token'):
-        session.headers['X-XSRF-TOKEN'] = cache_data['xsrf_token']
 
-    return session
+# Cached tokens with more than this many seconds left skip server validation
+FRESH_TOKEN_SECONDS = 300
 
 
-def _validate_session(session: requests.Session, verbose: bool = True) -> bool:
+def _load_cached_session(
+    cache: SessionCache,
+    verbose: bool = True,
+) -> requests.Session | None:
     """
-    Validate a session by making a lightweight API call.
+    Rebuild and validate a session from the cache.
 
-    Returns True if the session is valid, False otherwise.
+    Returns the session if its token has more than FRESH_TOKEN_SECONDS left or
+    the server still accepts it, or None if fresh authentication is required
+    (SessionCache.revalidate clears a rejected cache).
     """
-    try:
-        response = session.get(f'{IHCM_BASE_URL}/whrmux/webapi/api/data/me/home', timeout=10)
-        if response.status_code == 200:
-            return True
+    if verbose:
+        print('Checking for cached session...')
+
+    cache_data = cache.load()
+    if not cache_data:
         if verbose:
-            print(f'  Session validation failed: HTTP {response.status_code}')
-        return False
-    except requests.RequestException as e:
+            print('  No cached session found')
+        return None
+
+    if verbose:
+        created = cache_data.get('created_at', 'unknown')
+        print(f'  Found cached session from {created}')
+
+    session = _reconstruct_session_from_cache(cache_data, verbose)
+
+    # A token with plenty of life left is trusted without a round-trip
+    remaining = cache.token_seconds_remaining(cache_data['bearer_token'])
+    if remaining is not None and remaining > FRESH_TOKEN_SECONDS:
         if verbose:
-            print(f'  Session validation failed: {e}')
-        return False
+            print(f'  Cached token valid for another {int(remaining // 60)}min, skipping server check')
+        return session
+
+    # Near or past JWT expiry - session cookies often have sliding expiration,
+    # so ask the server rather than giving up on the cache
+    if verbose:
+        if remaining is not None and remaining <= 0:
+            print('  Note: JWT token expired, but trying session anyway...')
+        print('  Validating cached session...')
+
+    if cache.revalidate(session):
+        if verbose:
+            print('  Cached session is valid!')
+        cache.update_last_validated()
+        return session
+
+    if verbose:
+        print('  Cached session invalid, will re-authenticate')
+    return None
+
+
+def _cache_session(cache: SessionCache, session: requests.Session) -> None:
+    """Save the bearer token and cookies of a freshly authenticated session."""
+    cookies = _cookies_to_records(session.cookies)
+    bearer_token = session.headers.get('Authorization', '').replace('Bearer ', '')
+    xsrf_token = session.headers.get('X-XSRF-TOKEN')
+
+    # Written in the background - the caller's first API call needn't wait on disk
+    cache.save(bearer_token, cookies, xsrf_token, background=True)
 
 
 class AuthResult:
@@ -1052,23 +2100,18 @@ class AuthResult:
         self,
         session: requests.Session,
         browser_context: 'BrowserContext | None' = None,
-        playwright_instance: 'Playwright | None' = None,
-        browser: 'Browser | None' = None,
+        on_close: Callable[[], None] | None = None,
     ):
         self.session = session
         self.browser_context = browser_context
-        self._playwright = playwright_instance
-        self._browser = browser
+        self._on_close = on_close
 
     def close_browser(self) -> None:
-        """Close the browser and playwright instance if open."""
-        if self._browser:
-            self._browser.close()
-            self._browser = None
-            self.browser_context = None
-        if self._playwright:
-            self._playwright.stop()
-            self._playwright = None
+        """Close the browser context and hand its browser back to the pool."""
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+        self.browser_context = None
 
     def __enter__(self) -> 'AuthResult':
         return self
@@ -1101,69 +2144,31 @@ def create_authenticated_session_playwright(
     Returns:
         An authenticated requests.Session ready for iHCM API calls
     """
+    _check_browser_type(browser_type)
     cache = SessionCache(verbose=verbose)
 
     # Try to use cached session first
     if use_cache:
-        if verbose:
-            print('Checking for cached session...')
-
-        cache_data = cache.load()
-        if cache_data:
-            if verbose:
-                created = cache_data.get('created_at', 'unknown')
-                print(f'  Found cached session from {created}')
-
-            # Check JWT expiry as informational only - session cookies may still work
-            token_expired = cache.is_token_expired(cache_data['bearer_token'])
-            if token_expired and verbose:
-                print('  Note: JWT token expired, but trying session anyway...')
-
-            # Always try to validate - session cookies often have sliding expiration
-            if verbose:
-                print('  Validating cached session...')
-
-            session = _reconstruct_session_from_cache(cache_data, verbose)
-
-            if _validate_session(session, verbose):
-                if verbose:
-                    print('  Cached session is valid!')
-                cache.update_last_validated()
-                return session
-            else:
-                if verbose:
-                    print('  Cached session invalid, will re-authenticate')
-                cache.clear()
-        else:
-            if verbose:
-                print('  No cached session found')
+        session = _load_cached_session(cache, verbose)
+        if session:
+            return session
 
     # No valid cache, proceed with fresh authentication
-    username, password = get_credentials(item_name, verbose=verbose)
+    username, password = _get_credentials_while_prewarming(
+        item_name, verbose, browser_type, headless, driver_only=use_cache
+    )
 
     if verbose:
         print(f'  Username: {username}')
 
     session = authenticate_with_playwright(
-        username, password, verbose=verbose, headless=headless, browser_type=browser_type
+        username, password, verbose=verbose, headless=headless, browser_type=browser_type,
+        user_data_dir=SessionCache.PROFILE_DIR if use_cache else None,
     )
 
     # Cache the new session for future use
     if use_cache:
-        # Extract cookies and tokens from the session to save
-        cookies = []
-        for cookie in session.cookies:
-            cookies.append({
-                'name': cookie.name,
-                'value': cookie.value,
-                'domain': cookie.domain,
-                'path': cookie.path,
-            })
-
-        bearer_token = session.headers.get('Authorization', '').replace('Bearer ', '')
-        xsrf_token = session.headers.get('X-XSRF-TOKEN')
-
-        cache.save(bearer_token, cookies, xsrf_token)
+        _cache_session(cache, session)
 
     return session
 
@@ -1175,6 +2180,9 @@ def _authenticate_with_browser_kept_alive(
     headless: bool = True,
     timeout: int = 60000,
     browser_type: str = 'chromium',
+    user_data_dir: Path | None = None,
+    stealth: bool | None = None,
+    slow_mo_ms: int = 0,
 ) -> AuthResult:
     """
     Authenticate and return both session and live browser context.
@@ -1183,186 +2191,39 @@ def _authenticate_with_browser_kept_alive(
     so it can be used for subsequent requests (e.g., PDF downloads) that
     require the SiteMinder SSO session.
     """
-    if not PLAYWRIGHT_AVAILABLE:
-        raise RuntimeError(
-            'Playwright and playwright-stealth are required for browser-based authentication.\n'
-            'Install with: uv pip install playwright playwright-stealth && uv run playwright install chromium'
-        )
+    _check_browser_type(browser_type)
 
     if verbose:
         print(f'Starting browser-based authentication ({browser_type})...')
 
-    p = sync_playwright().start()
-    browser_launcher = getattr(p, browser_type, p.chromium)
-    browser = browser_launcher.launch(headless=headless, slow_mo=100)
-    context = browser.new_context(
-        user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-        viewport={'width': 1280, 'height': 800},
-    )
-    page = context.new_page()
-
-    # Apply stealth mode to evade bot detection
-    if verbose:
-        print('  Applying stealth mode...')
-    Stealth().apply_stealth_sync(page)
-
-    try:
-        # Navigate to iHCM - let the full redirect chain complete
-        if verbose:
-            print('  Navigating to iHCM (following SSO redirects)...')
-
-        page.goto(
-            f'{IHCM_BASE_URL}/whrmux/web/me/home',
-            wait_until='networkidle',
-            timeout=timeout,
-        )
-
-        # Wait for page to fully stabilize after navigation
-        time.sleep(10)
-
-        # Wait for username field to appear
-        if verbose:
-            print('  Waiting for login form...')
-
-        username_input = page.wait_for_selector(
-            'input[name="userId"], input[name="user"], input[type="email"], input[type="text"]',
-            state='visible',
-            timeout=timeout,
-        )
-
-        if verbose:
-            print('  Entering username...')
-        username_input.fill(username)
+    apply_stealth = _should_apply_stealth(stealth, headless, user_data_dir)
 
-        # Click Next and wait for password field
-        if verbose:
-            print('  Clicking Next...')
+    browser, context = _launch_browser_context(browser_type, headless, user_data_dir, slow_mo_ms)
 
-        time.sleep(2)
-
-        try:
-            next_btn = page.locator('text=Next').first
-            next_btn.wait_for(state='visible', timeout=timeout)
-            next_btn.click()
-        except PlaywrightTimeout:
-            screenshot_path = Path('auth_failure_next_btn.png')
-            page.screenshot(path=str(screenshot_path))
-            if verbose:
-                print(f'  Debug screenshot saved to {screenshot_path}')
-                print(f'  Current URL: {page.url}')
-            raise
-
-        time.sleep(5)
-
-        # Wait for password field
+    # Apply stealth mode to evade bot detection, on the context so that every
+    # page of the SSO flow gets it
+    if apply_stealth:
         if verbose:
-            print('  Waiting for password field...')
-
-        password_input = page.wait_for_selector(
-            'input[type="password"]',
-            state='visible',
-            timeout=timeout,
-        )
-
-        if verbose:
-            print('  Entering password...')
-        password_input.fill(password)
-
-        # Submit and wait for navigation back to iHCM
-        if verbose:
-            print('  Submitting login...')
+            print('  Applying stealth mode...')
+        context.add_init_script(_stealth_script())
+    page = context.new_page()
 
-        submit_btn = page.query_selector(
-            'button[type="submit"], button:has-text("Sign In"), button:has-text("Login")'
+    try:
+        bearer_token, cookies, xsrf_token = _run_auth_flow(
+            page, context, username, password, verbose, timeout, browser_type
         )
-        if submit_btn:
-            submit_btn.click()
-        else:
-            password_input.press('Enter')
-
-        time.sleep(10)
-
-        # Poll for bearer token in sessionStorage
-        if verbose:
-            print('  Waiting for authentication to complete...')
-
-        bearer_token = None
-        for _ in range(30):
-            time.sleep(1)
-            try:
-                bearer_token = page.evaluate('() => sessionStorage.getItem("iHcmBearerToken")')
-                if bearer_token:
-                    break
-            except Exception:
-                pass
-
-        if not bearer_token:
-            raise RuntimeError(
-                f'Login did not complete successfully. Final URL: {page.url}'
-            )
-
-        if verbose:
-            print('  Bearer token acquired!')
-
-        # Extract cookies from browser context
-        if verbose:
-            print('  Extracting cookies...')
-        cookies = context.cookies()
-
-        xsrf_token = None
-        for cookie in cookies:
-            if cookie['name'] == 'XSRF-TOKEN':
-                xsrf_token = cookie['value']
-                break
-
-        if verbose:
-            print(f'  Extracted {len(cookies)} cookies')
 
         # Close the page but keep context and browser alive
         page.close()
-
-    except PlaywrightTimeout as e:
-        browser.close()
-        p.stop()
-        raise RuntimeError(f'Authentication timed out: {e}') from e
-    except Exception as e:
-        browser.close()
-        p.stop()
-        error_msg = str(e)
-        if 'Page crashed' in error_msg or 'browser has disconnected' in error_msg.lower():
-            raise RuntimeError(
-                f'Browser crashed during authentication. This may indicate the browser '
-                f'is not properly installed. Try running:\n'
-                f'  uv run playwright install {browser_type}\n\n'
-                f'Original error: {e}'
-            ) from e
-        raise RuntimeError(f'Authentication failed: {e}') from e
+    except Exception:
+        _close_browser_context(browser, context)
+        raise
 
     # Build a requests session with the extracted auth
     if verbose:
         print('  Configuring session...')
 
-    session = create_session()
-
-    for cookie in cookies:
-        session.cookies.set(
-            cookie['name'],
-            cookie['value'],
-            domain=cookie.get('domain', ''),
-            path=cookie.get('path', '/'),
-        )
-
-    session.headers.update({
-        'Accept': 'application/json, text/plain, */*',
-        'Content-Type': 'application/json;charset=UTF-8',
-        'X-Requested-With': 'XMLHttpRequest',
-        'Origin': IHCM_BASE_URL,
-        'Referer': f'{IHCM_BASE_URL}/whrmux/web/me/directory/',
-        'Authorization': f'Bearer {bearer_token}',
-    })
-
-    if xsrf_token:
-        session.headers['X-XSRF-TOKEN'] = xsrf_token
+    session = _api_session(bearer_token, cookies, xsrf_token)
 
     if verbose:
         print('  Browser authentication complete (browser kept alive for PDF downloads)')
@@ -1370,8 +2231,7 @@ def _authenticate_with_browser_kept_alive(
     return AuthResult(
         session=session,
         browser_context=context,
-        playwright_instance=p,
-        browser=browser,
+        on_close=lambda: _close_browser_context(browser, context),
     )
 
 
@@ -1413,69 +2273,32 @@ def create_authenticated_session_with_browser(
     Returns:
         AuthResult containing session and optionally browser_context
     """
+    _check_browser_type(browser_type)
     cache = SessionCache(verbose=verbose)
 
     # Try to use cached session first
     if use_cache:
-        if verbose:
-            print('Checking for cached session...')
-
-        cache_data = cache.load()
-        if cache_data:
-            if verbose:
-                created = cache_data.get('created_at', 'unknown')
-                print(f'  Found cached session from {created}')
-
-            # Check JWT expiry as informational only - session cookies may still work
-            token_expired = cache.is_token_expired(cache_data['bearer_token'])
-            if token_expired and verbose:
-                print('  Note: JWT token expired, but trying session anyway...')
-
-            # Always try to validate - session cookies often have sliding expiration
-            if verbose:
-                print('  Validating cached session...')
-
-            session = _reconstruct_session_from_cache(cache_data, verbose)
-
-            if _validate_session(session, verbose):
-                if verbose:
-                    print('  Cached session is valid!')
-                cache.update_last_validated()
-                # Return session-only AuthResult (no browser)
-                return AuthResult(session=session)
-            else:
-                if verbose:
-                    print('  Cached session invalid, will re-authenticate')
-                cache.clear()
-        else:
-            if verbose:
-                print('  No cached session found')
+        session = _load_cached_session(cache, verbose)
+        if session:
+            # Return session-only AuthResult (no browser)
+            return AuthResult(session=session)
 
     # No valid cache, proceed with fresh authentication (keeping browser alive)
-    username, password = get_credentials(item_name, verbose=verbose)
+    username, password = _get_credentials_while_prewarming(
+        item_name, verbose, browser_type, headless, driver_only=use_cache
+    )
 
     if verbose:
         print(f'  Username: {username}')
 
     auth_result = _authenticate_with_browser_kept_alive(
-        username, password, verbose=verbose, headless=headless, browser_type=browser_type
+        username, password, verbose=verbose, headless=headless, browser_type=browser_type,
+        user_data_dir=SessionCache.PROFILE_DIR if use_cache else None,
     )
 
     # Cache the new session for future use
     if use_cache:
-        cookies = []
-        for cookie in auth_result.session.cookies:
-            cookies.append({
-                'name': cookie.name,
-                'value': cookie.value,
-                'domain': cookie.domain,
-                'path': cookie.path,
-            })
-
-        bearer_token = auth_result.session.headers.get('Authorization', '').replace('Bearer ', '')
-        xsrf_token = auth_result.session.headers.get('X-XSRF-TOKEN')
-
-        cache.save(bearer_token, cookies, xsrf_token)
+        _cache_session(cache, auth_result.session)
 
     return auth_result
 
@@ -1490,7 +2313,7 @@ def test_authentication(
         if use_playwright:
             session = create_authenticated_session_playwright(headless=True, use_cache=use_cache)
         else:
-            session = create_authenticated_session(debug=debug)
+            session = create_authenticated_session(debug=debug, use_cache=use_cache)
 
         print()
         print('Testing API access...')
@@ -1554,14 +2377,14 @@ if __name__ == '__main__':
     # Handle cache clearing
     if args.clear_cache:
         cache = SessionCache(verbose=True)
-        cache.clear()
+        cache.clear(include_profile=True)
         print()
 
     use_cache = not args.no_cache
 
     if args.no_playwright:
         print('Using API-based authentication (may fail due to SSO)')
-        success = test_authentication(debug=args.debug, use_playwright=False)
+        success = test_authentication(debug=args.debug, use_playwright=False, use_cache=use_cache)
     else:
         print('Using Playwright browser authentication')
         # For visible mode, we need to run differently
@@ -5,6 +5,8 @@
 #   "playwright",
 #   "playwright-stealth",
 #   "python-dotenv",
+#   "orjson",
+#   "brotli",
 # ]
 # ///
 """
@@ -20,19 +22,80 @@ Options:
     --visible       Show browser window during authentication
     --clear-cache   Clear cached session and force fresh authentication
     --no-cache      Skip session cache entirely
+    --concurrency N Max pages fetched in parallel (default: 4, 1 = serial)
+    --rate R        Cap requests per second (default: paced by server headers only)
+    --csv-fields-only  Keep only the CSV columns in memory and in the JSON export
 """
 
 import argparse
 import csv
-import json
 import sys
 import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import requests
 
-from ihcm_auth import create_authenticated_session_playwright
+from ihcm_auth import (
+    RateLimiter,
+    SessionCache,
+    ThreadSessions,
+    create_authenticated_session_playwright,
+    fast_json_dumps,
+    fast_json_loads,
+    looks_like_html,
+    use_rate_limiter,
+)
+
+
+class BatchRejected(RuntimeError):
+    """The API failed a page request in a way a smaller page might avoid."""
+
+
+class BatchSizer:
+    """
+    Adapts the page size for serial pagination (AIMD-style).
+
+    The size grows 1.5x while the mean latency of the last WINDOW pages stays
+    under TARGET_SECONDS. It halves when a page is rejected. It never exceeds
+    what the server actually returns per page: the API silently caps the
+    limit, and asking for more would only misalign the prefetched offsets.
+    """
+
+    WINDOW = 5
+    TARGET_SECONDS = 1.0
+    MIN_SIZE = 25
+    MAX_SIZE = 1000
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ceiling = self.MAX_SIZE
+        self._latencies: deque[float] = deque(maxlen=self.WINDOW)
+
+    def record(self, requested: int, returned: int, seconds: float, at_end: bool) -> None:
+        """Feed back one page: how many rows were asked for and returned, and how long it took."""
+        # A row or so short is a known API quirk, not a cap
+        if returned < requested * 0.9 and not at_end:
+            self.ceiling = max(self.MIN_SIZE, returned)
+            self.size = min(self.size, self.ceiling)
+            self._latencies.clear()
+            return
+
+        self._latencies.append(seconds)
+        if len(self._latencies) == self.WINDOW and sum(self._latencies) / self.WINDOW < self.TARGET_SECONDS:
+            self.size = min(self.ceiling, int(self.size * 1.5))
+            self._latencies.clear()
+
+    def shrink(self) -> bool:
+        """Halve the size after a rejected page; False if it is already at the minimum."""
+        if self.size <= self.MIN_SIZE:
+            return False
+        self.size = max(self.MIN_SIZE, self.size // 2)
+        self._latencies.clear()
+        return True
 
 
 class IHCMExtractor:
@@ -40,6 +103,20 @@ class IHCMExtractor:
 
     API_URL = 'https://ihcm.adp.com/whrmux/webapi/api/employee'
 
+    # Throttled (429) pages are retried this many times, paced by the limiter
+    MAX_THROTTLE_RETRIES = 3
+
+    # Request fields that don't change between pages
+    BASE_PAYLOAD = {
+        'filter': [],
+        'boolStr': 'AND',
+        'orderBy': 'PEOPLE.LASTNAME, PEOPLE.FIRSTNAME',
+        'showParameterics': False,
+    }
+
+    # Sent with the pre-serialized body instead of letting requests encode json=
+    JSON_HEADERS = {'Content-Type': 'application/json'}
+
     CSV_FIELDS = [
         'id',
         'email',
@@ -70,28 +147,50 @@ class IHCMExtractor:
         self,
         session: requests.Session,
         batch_size: int = 100,
-        delay_seconds: float = 0.5,
+        concurrency: int = 4,
+        limiter: RateLimiter | None = None,
+        fields: list[str] | None = None,
     ):
         self.session = session
+        # Page workers each send through their own copy of the session, so
+        # their rotating session cookies don't overwrite one another
+        self._sessions = ThreadSessions(session)
+        # When set, records are cut down to these keys as soon as they're parsed
+        self.fields = fields
         self.batch_size = batch_size
-        self.delay_seconds = delay_seconds
-
-    def fetch_batch(self, start: int) -> tuple[list[dict], int]:
+        self.concurrency = concurrency
+        self.total = 0
+        # One warm keep-alive connection per worker; 429s are left to the limiter
+        use_rate_limiter(session, concurrency)
+        # Paced by the server's rate limit headers rather than a fixed delay
+        self.limiter = limiter or RateLimiter(max_concurrency=concurrency)
+
+    def close(self) -> None:
+        """Hand the newest session cookies from the page workers back to the session."""
+        self._sessions.merge()
+
+    def fetch_batch(self, start: int, limit: int | None = None) -> tuple[list[dict], int]:
         """
-        Fetch a single batch of employees starting at the given index.
-        Returns (employee_list, total_count).
+        Fetch a single batch of employees (batch_size unless limit is given)
+        starting at the given index. Returns (employee_list, total_count).
         """
-        payload = {
-            'start': start,
-            'end': start + self.batch_size - 1,
-            'limit': self.batch_size,
-            'filter': [],
-            'boolStr': 'AND',
-            'orderBy': 'PEOPLE.LASTNAME, PEOPLE.FIRSTNAME',
-            'showParameterics': False,
-        }
-
-        response = self.session.post(self.API_URL, json=payload)
+        limit = limit or self.batch_size
+        body = fast_json_dumps({'start': start, 'end': start + limit - 1, 'limit': limit, **self.BASE_PAYLOAD})
+
+        for attempt in range(self.MAX_THROTTLE_RETRIES + 1):
+            self.limiter.wait()
+            try:
+                response = self._sessions.get().post(self.API_URL, data=body, headers=self.JSON_HEADERS)
+            except Exception:
+                self.limiter.update(None)
+                raise
+            self.limiter.update(response)
+
+            if response.status_code != 429 or attempt == self.MAX_THROTTLE_RETRIES:
+                break
+            # The limiter already honours Retry-After; back off anyway without one
+            if 'Retry-After' not in response.headers:
+                self.limiter.pause(2 ** attempt)
 
         if response.status_code == 401:
             raise RuntimeError(
@@ -99,78 +198,216 @@ class IHCMExtractor:
                 'Try running with --clear-cache to force fresh authentication.'
             )
 
+        if response.status_code in (400, 429) or response.status_code >= 500:
+            raise BatchRejected(f'API returned status {response.status_code}: {response.text[:200]}')
+
         if response.status_code != 200:
             raise RuntimeError(f'API returned status {response.status_code}: {response.text[:200]}')
 
-        if response.text.strip().startswith('<!doctype') or response.text.strip().startswith('<html'):
+        if looks_like_html(response):
             raise RuntimeError('Session expired - received login page. Please refresh credentials.')
 
-        result = response.json()
-        return result.get('data', []), result.get('total', 0)
+        try:
+            result = fast_json_loads(response.content)
+        except ValueError as e:
+            raise BatchRejected(f'API returned invalid JSON: {e}') from e
 
-    def extract_all(self) -> list[dict]:
-        """Extract all employees using paginated requests with rate limiting."""
-        all_employees = []
-        start = 0
-        total = None
-
-        print(f'Starting extraction with batch size {self.batch_size}...')
-        print(f'Rate limiting: {self.delay_seconds}s delay between requests')
-        print()
-
-        while True:
-            batch, reported_total = self.fetch_batch(start)
+        data = result.get('data', [])
+        if self.fields:
+            fields = self.fields
+            data = [{key: record[key] for key in fields if key in record} for record in data]
+        return data, result.get('total', 0)
 
-            if total is None:
-                total = reported_total
-                print(f'Total employees to extract: {total:,}')
-                print()
+    def _timed_fetch(self, start: int, limit: int) -> tuple[list[dict], float]:
+        began = time.monotonic()
+        batch = self.fetch_batch(start, limit)[0]
+        return batch, time.monotonic() - began
 
-            if not batch:
-                # Empty batch means we've reached the end
-                break
-
-            all_employees.extend(batch)
+    def _iter_pages_concurrently(self, step: int, total: int) -> Iterator[list[dict]]:
+        """
+        Yield every page after the first, in offset order, each requested
+        with the first page's length as its limit and stepping by it. The
+        first page already told us the total, so all offsets are known up
+        front; up to twice `concurrency` pages are requested ahead of the one
+        being yielded.
+
+        Stops after a page that comes back shorter or longer than that -
+        later offsets would be misaligned - and the caller continues serially
+        from there.
+        """
+        offsets = iter(range(step, total, step))
+        pending: deque[tuple[int, Future]] = deque()
+
+        print(f'Fetching {-(-(total - step) // step):,} more pages, {self.concurrency} at a time')
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            def fill() -> None:
+                while len(pending) < self.concurrency * 2:
+                    offset = next(offsets, None)
+                    if offset is None:
+                        return
+                    pending.append((offset, executor.submit(self.fetch_batch, offset, step)))
+
+            fill()
+            while pending:
+                offset, future = pending.popleft()
+                batch = future.result()[0]
+                fill()
+                yield batch
+                if len(batch) != step and offset + len(batch) < total:
+                    for _, later in pending:
+                        later.cancel()
+                    return
+
+    def _iter_pages_pipelined(self, start: int, total: int, sizer: BatchSizer) -> Iterator[list[dict]]:
+        """
+        Yield pages one after another from offset start, keeping the request
+        for the following page in flight while the current one is consumed.
+
+        Page sizes come from sizer, which grows them while the server answers
+        quickly and halves them when a page is rejected (the page is then
+        retried). The following page is assumed to start right after a full
+        current page; if a page comes back short, that speculative request is
+        dropped and the real next offset fetched instead.
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            limit = sizer.size
+            current = executor.submit(self._timed_fetch, start, limit)
+            prefetch = None
+            while True:
+                ahead, next_limit = start + limit, sizer.size
+                prefetch = executor.submit(self._timed_fetch, ahead, next_limit) if ahead < total else None
+
+                try:
+                    batch, seconds = current.result()
+                except BatchRejected as e:
+                    if prefetch is not None:
+                        prefetch.cancel()
+                    if not sizer.shrink():
+                        raise
+                    print(f'  {e} - retrying with batch size {sizer.size}')
+                    limit = sizer.size
+                    current = executor.submit(self._timed_fetch, start, limit)
+                    continue
+
+                if not batch:
+                    # Empty batch means we've reached the end
+                    break
+                yield batch
+
+                # Move to next page (use actual batch length for accuracy)
+                sizer.record(limit, len(batch), seconds, start + len(batch) >= total)
+                start += len(batch)
+                if start >= total:
+                    break
+                if prefetch is not None and start == ahead:
+                    current, limit = prefetch, next_limit
+                else:
+                    if prefetch is not None:
+                        prefetch.cancel()
+                    limit = sizer.size
+                    current = executor.submit(self._timed_fetch, start, limit)
+
+            if prefetch is not None:
+                prefetch.cancel()
+
+    def iter_batches(self) -> Iterator[list[dict]]:
+        """
+        Yield all employees batch by batch, in directory order, so callers can
+        write them out as they arrive rather than holding the whole directory.
 
-            progress = len(all_employees)
-            pct = (progress / total * 100) if total > 0 else 0
-            print(f'  Retrieved {progress:,} / {total:,} employees ({pct:.1f}%)')
+        After the first page, the remaining pages are fetched concurrently
+        (pipelined one after another, with an adaptive page size, with
+        concurrency 1), paced by the rate limiter rather than a fixed delay.
+        Sets self.total from the first page.
+        """
+        print(f'Starting extraction with batch size {self.batch_size}...')
+        print(f'Concurrency: up to {self.concurrency} requests in flight, paced by server rate limits')
+        print()
 
-            if progress >= total:
-                break
+        first, total = self.fetch_batch(0)
+        self.total = total
+        print(f'Total employees to extract: {total:,}')
+        print()
 
-            # Move to next page (use actual batch length for accuracy)
-            start += len(batch)
-            time.sleep(self.delay_seconds)
+        if not first:
+            return
+
+        retrieved = len(first)
+        self._print_progress(retrieved)
+        yield first
+
+        # Later pages step by what the server actually returned per page
+        step = start = len(first)
+
+        if start < total and self.concurrency > 1:
+            # The first page gave us the total - fan out the rest
+            for batch in self._iter_pages_concurrently(step, total):
+                retrieved += len(batch)
+                start += len(batch)
+                self._print_progress(retrieved)
+                yield batch
+            if start < total:
+                print(f'  Unexpected page length at offset {start:,}, continuing serially')
+
+        if start < total:
+            # Serial pages adapt their size, starting from what the server returned
+            sizer = BatchSizer(step)
+            for batch in self._iter_pages_pipelined(start, total, sizer):
+                retrieved += len(batch)
+                self._print_progress(retrieved)
+                yield batch
+
+    def _print_progress(self, retrieved: int) -> None:
+        pct = (retrieved / self.total * 100) if self.total > 0 else 0
+        print(f'  Retrieved {retrieved:,} / {self.total:,} employees ({pct:.1f}%)')
 
+    def extract_all(self) -> list[dict]:
+        """Extract all employees into a single list (see iter_batches)."""
+        all_employees = [employee for batch in self.iter_batches() for employee in batch]
         print()
         print(f'Extraction complete: {len(all_employees):,} employees')
         return all_employees
 
 
-def export_to_json(employees: list[dict], filepath: Path) -> None:
-    """Export employee data to a JSON file with pretty formatting."""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(
-            {
-                'exported_at': datetime.now().isoformat(),
-                'total_count': len(employees),
-                'employees': employees,
-            },
-            f,
-            indent=2,
-            ensure_ascii=False,
-        )
-    print(f'Exported to JSON: {filepath}')
-
-
-def export_to_csv(employees: list[dict], filepath: Path, fields: list[str]) -> None:
-    """Export employee data to a CSV file with specified fields."""
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
-        writer.writeheader()
-        writer.writerows(employees)
-    print(f'Exported to CSV: {filepath}')
+def export_batches(
+    batches: Iterable[list[dict]],
+    json_path: Path,
+    csv_path: Path,
+    fields: list[str],
+) -> int:
+    """
+    Stream employee batches to a pretty-printed JSON file and a CSV file as
+    they arrive, so memory stays bounded by the batch size rather than the
+    directory size. Returns the number of employees written.
+
+    Both files are written under a .partial name and only renamed into place
+    once every batch has been written.
+    """
+    json_tmp = json_path.with_name(json_path.name + '.partial')
+    csv_tmp = csv_path.with_name(csv_path.name + '.partial')
+    count = 0
+
+    with open(json_tmp, 'wb') as json_file, open(csv_tmp, 'w', newline='', encoding='utf-8') as csv_file:
+        json_file.write(b'{\n  "exported_at": ' + fast_json_dumps(datetime.now().isoformat()) + b',\n  "employees": [')
+        writer = csv.writer(csv_file)
+        writer.writerow(fields)
+
+        for batch in batches:
+            for employee in batch:
+                # Indent each record to its depth inside the employees array
+                record = fast_json_dumps(employee, indent=True).replace(b'\n', b'\n    ')
+                json_file.write((b',\n    ' if count else b'\n    ') + record)
+                count += 1
+            # Plain rows; missing fields are left blank
+            writer.writerows([employee.get(field, '') for field in fields] for employee in batch)
+
+        json_file.write((b'\n  ]' if count else b']') + f',\n  "total_count": {count}\n}}'.encode())
+
+    json_tmp.replace(json_path)
+    csv_tmp.replace(csv_path)
+    print(f'Exported to JSON: {json_path}')
+    print(f'Exported to CSV: {csv_path}')
+    return count
 
 
 def test_connection(session: requests.Session) -> bool:
@@ -196,6 +433,22 @@ def test_connection(session: requests.Session) -> bool:
         print(f'Connection failed: {e}')
         return False
 
+    finally:
+        extractor.close()
+
+
+def authenticate(headless: bool, use_cache: bool) -> requests.Session:
+    """Authenticate (reusing the cached session if allowed), exiting on failure."""
+    try:
+        return create_authenticated_session_playwright(
+            verbose=True,
+            headless=headless,
+            use_cache=use_cache,
+        )
+    except Exception as e:
+        print(f'\nAuthentication failed: {e}')
+        sys.exit(1)
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -206,6 +459,12 @@ def main():
     parser.add_argument('--visible', action='store_true', help='Show browser during authentication')
     parser.add_argument('--clear-cache', action='store_true', help='Clear cached session before auth')
     parser.add_argument('--no-cache', action='store_true', help='Skip session cache entirely')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Max pages fetched in parallel (default: 4, 1 = serial)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Cap requests per second (default: paced by server headers only)')
+    parser.add_argument('--csv-fields-only', action='store_true',
+                        help='Keep only the CSV columns in memory and in the JSON export')
     args = parser.parse_args()
 
     print('iHCM Employee Directory Extractor')
@@ -214,29 +473,31 @@ def main():
 
     # Handle cache options
     if args.clear_cache:
-        from ihcm_auth import SessionCache
         cache = SessionCache(verbose=True)
-        cache.clear()
+        cache.clear(include_profile=True)
         print()
 
     use_cache = not args.no_cache
 
-    # Authenticate using Playwright
-    try:
-        session = create_authenticated_session_playwright(
-            verbose=True,
-            headless=not args.visible,
-            use_cache=use_cache,
-        )
-    except Exception as e:
-        print(f'\nAuthentication failed: {e}')
-        sys.exit(1)
+    # Authenticate using Playwright (or the cached session)
+    session = authenticate(headless=not args.visible, use_cache=use_cache)
 
     print()
 
     if not test_connection(session):
-        print('\nConnection test failed. Try --clear-cache to force fresh authentication.')
-        sys.exit(1)
+        if not use_cache:
+            print('\nConnection test failed. Try --clear-cache to force fresh authentication.')
+            sys.exit(1)
+
+        # The cached session can be revoked server-side while its token still
+        # looks valid - drop it and log in afresh once before giving up
+        print('\nCached session rejected, re-authenticating...')
+        SessionCache(verbose=True).clear()
+        session = authenticate(headless=not args.visible, use_cache=True)
+        print()
+        if not test_connection(session):
+            print('\nConnection test failed after fresh authentication.')
+            sys.exit(1)
 
     print()
     print('-' * 50)
@@ -244,14 +505,15 @@ def main():
     print('-' * 50)
     print()
 
+    concurrency = max(1, args.concurrency)
     extractor = IHCMExtractor(
         session,
         batch_size=100,
-        delay_seconds=0.5,
+        concurrency=concurrency,
+        limiter=RateLimiter(max_concurrency=concurrency, requests_per_second=args.rate),
+        fields=IHCMExtractor.CSV_FIELDS if args.csv_fields_only else None,
     )
 
-    employees = extractor.extract_all()
-
     # Generate timestamped filenames
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     output_dir = Path('.')
@@ -259,10 +521,14 @@ def main():
     json_path = output_dir / f'ihcm_employees_{timestamp}.json'
     csv_path = output_dir / f'ihcm_employees_{timestamp}.csv'
 
+    # Batches are written out as they arrive rather than collected first
+    try:
+        count = export_batches(extractor.iter_batches(), json_path, csv_path, IHCMExtractor.CSV_FIELDS)
+    finally:
+        extractor.close()
+
     print()
-    print('Exporting data...')
-    export_to_json(employees, json_path)
-    export_to_csv(employees, csv_path, IHCMExtractor.CSV_FIELDS)
+    print(f'Extraction complete: {count:,} employees')
 
     print()
     print('Done!')
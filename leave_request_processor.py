@@ -5,6 +5,8 @@
 #   "playwright",
 #   "playwright-stealth",
 #   "python-dotenv",
+#   "orjson",
+#   "brotli",
 # ]
 # ///
 """
@@ -20,6 +22,9 @@ Usage:
     # Approve a specific leave request by record ID
     uv run leave_request_processor.py approve <record_id>
 
+    # Approve several at once (ids as arguments and/or one per line in a file)
+    uv run leave_request_processor.py approve <record_id> <record_id> --from-file ids.txt
+
     # Reject a specific leave request by record ID
     uv run leave_request_processor.py reject <record_id> --reason "Insufficient notice"
 
@@ -28,13 +33,76 @@ Usage:
 """
 
 import argparse
+import hashlib
 import json
+import random
+import re
 import sys
+import threading
 import time
+from pathlib import Path
+from typing import Any
 
 import requests
 
-from ihcm_auth import IHCM_BASE_URL, create_authenticated_session_playwright
+from ihcm_auth import (
+    IHCM_BASE_URL,
+    SessionCache,
+    create_authenticated_session_playwright,
+    fast_json_dumps,
+    fast_json_loads,
+)
+
+
+class ETagCache:
+    """
+    On-disk cache of ETag-validated GET responses, so repeated runs can send
+    If-None-Match and get an empty 304 back when nothing has changed.
+
+    Bodies contain HR data, so the directory and files are private to the user.
+    """
+
+    CACHE_DIR = SessionCache.CACHE_DIR / 'etags'
+    INDEX_FILE = CACHE_DIR / 'index.json'
+
+    def __init__(self):
+        self._index: dict | None = None
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> dict:
+        if self._index is None:
+            try:
+                self._index = fast_json_loads(self.INDEX_FILE.read_bytes())
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _body_path(self, url: str) -> Path:
+        return self.CACHE_DIR / f'{hashlib.sha256(url.encode()).hexdigest()}.body'
+
+    def etag(self, url: str) -> str | None:
+        with self._lock:
+            return self._load_index().get(url)
+
+    def body(self, url: str) -> bytes | None:
+        try:
+            return self._body_path(url).read_bytes()
+        except OSError:
+            return None
+
+    def store(self, url: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            try:
+                self.CACHE_DIR.mkdir(parents=True, exist_ok=True, mode=0o700)
+                body_path = self._body_path(url)
+                body_path.write_bytes(body)
+                body_path.chmod(0o600)
+                index = self._load_index()
+                index[url] = etag
+                self.INDEX_FILE.write_bytes(fast_json_dumps(index))
+                self.INDEX_FILE.chmod(0o600)
+            except OSError:
+                pass  # Only an optimisation
 
 
 class LeaveRequestProcessor:
@@ -49,15 +117,40 @@ class LeaveRequestProcessor:
     MESSAGES_DRAWER_URL = f'{IHCM_BASE_URL}/whrmux/webapi/api/messages/drawer'
     MESSAGE_BODY_URL = f'{IHCM_BASE_URL}/whrmux/webapi/api/messages/messagebody'
 
-    def __init__(self, session: requests.Session, verbose: bool = True):
+    # Subjects of leave-related "Things to do" messages
+    LEAVE_RE = re.compile(r'leave|absence|working from home|holiday|annual', re.IGNORECASE)
+
+    def __init__(self, session: requests.Session, verbose: bool = True, etag_cache: ETagCache | None = None):
         self.session = session
         self.verbose = verbose
+        self.etag_cache = etag_cache or ETagCache()
 
     def _log(self, message: str):
         """Print a message if verbose mode is enabled."""
         if self.verbose:
             print(message)
 
+    def _conditional_get(self, url: str, params: dict | None = None) -> tuple[int, bytes]:
+        """
+        GET url with If-None-Match when a cached ETag exists, returning
+        (status, body).
+
+        A 304 is returned as (200, cached body), so callers handle both the
+        same way; a 200 with an ETag refreshes the cache.
+        """
+        cache_key = requests.Request('GET', url, params=params).prepare().url or url
+        etag = self.etag_cache.etag(cache_key)
+        cached_body = self.etag_cache.body(cache_key) if etag else None
+        headers = {'If-None-Match': etag} if etag and cached_body is not None else None
+
+        response = self.session.get(url, params=params, headers=headers)
+
+        if response.status_code == 304 and cached_body is not None:
+            return 200, cached_body
+        if response.status_code == 200 and response.headers.get('ETag'):
+            self.etag_cache.store(cache_key, response.headers['ETag'], response.content)
+        return response.status_code, response.content
+
     def get_pending_requests_from_messages(self) -> list[dict]:
         """
         Get pending leave requests from the messages/todo drawer.
@@ -67,32 +160,30 @@ class LeaveRequestProcessor:
         """
         self._log('Fetching leave requests from messages drawer...')
 
-        response = self.session.get(
+        status, body = self._conditional_get(
             self.MESSAGES_DRAWER_URL,
             params={'todoItemsOnly': 'true'}
         )
 
-        if response.status_code != 200:
-            raise RuntimeError(f'Failed to fetch messages: {response.status_code} {response.text[:200]}')
+        if status != 200:
+            raise RuntimeError(f'Failed to fetch messages: {status} {_preview(body, 200)}')
 
         # Handle empty response (often indicates insufficient permissions)
-        if not response.text or not response.text.strip():
+        if not body.strip():
             self._log('  Warning: Empty response from messages endpoint (may indicate insufficient permissions)')
             return []
 
         try:
-            data = response.json()
-        except requests.exceptions.JSONDecodeError:
-            self._log(f'  Warning: Invalid JSON response: {response.text[:100]}')
+            data = fast_json_loads(body)
+        except ValueError:
+            self._log(f'  Warning: Invalid JSON response: {_preview(body, 100)}')
             return []
 
         # Filter for leave-related messages
-        leave_requests = []
-        for message in data.get('data', []):
-            # Check if this is a leave request notification
-            subject = message.get('subject', '').lower()
-            if any(term in subject for term in ['leave', 'absence', 'working from home', 'holiday', 'annual']):
-                leave_requests.append(message)
+        leave_requests = [
+            message for message in data.get('data', [])
+            if self.LEAVE_RE.search(message.get('subject') or '')
+        ]
 
         self._log(f'  Found {len(leave_requests)} leave-related messages')
         return leave_requests
@@ -100,12 +191,12 @@ class LeaveRequestProcessor:
     def get_message_details(self, message_id: str) -> dict:
         """Get the full details of a message/leave request."""
         url = f'{self.MESSAGE_BODY_URL}/{message_id}/0'
-        response = self.session.get(url)
+        status, body = self._conditional_get(url)
 
-        if response.status_code != 200:
-            raise RuntimeError(f'Failed to fetch message details: {response.status_code}')
+        if status != 200:
+            raise RuntimeError(f'Failed to fetch message details: {status}')
 
-        return response.json()
+        return fast_json_loads(body)
 
     def get_pending_requests_from_grid(
         self,
@@ -129,14 +220,11 @@ class LeaveRequestProcessor:
         """
         self._log('Fetching pending leave requests from grid...')
 
-        # First, get the form metadata to understand the structure
-        params_url = f'{self.PENDING_REQUESTS_URL}?insertMode=false&parameters='
-        if older_than_days > 0:
-            params_url += json.dumps({'_AGEOFLEAVEREQUEST': str(older_than_days)})
+        age_filter = str(older_than_days) if older_than_days > 0 else None
 
         # The schema-grid endpoint returns the actual data
         # This payload structure was observed in browser network traffic
-        payload = {
+        payload: dict[str, Any] = {
             'parentRoute': 'expert',
             'dataFromApi': False,
             'instanceName': 'grid-controller-pendingRequestsGrid',
@@ -148,7 +236,7 @@ class LeaveRequestProcessor:
                 'insertMode': False,
             },
             'formControlParameters': {
-                '_AGEOFLEAVEREQUEST': str(older_than_days) if older_than_days > 0 else None,
+                '_AGEOFLEAVEREQUEST': age_filter,
             },
             'filter': {
                 'showParameterics': False,
@@ -203,18 +291,18 @@ class LeaveRequestProcessor:
             params['parameters'] = json.dumps({'_AGEOFLEAVEREQUEST': str(older_than_days)})
         params['insertMode'] = 'false'
 
-        response = self.session.get(self.PENDING_REQUESTS_URL, params=params)
+        status, body = self._conditional_get(self.PENDING_REQUESTS_URL, params=params)
 
-        if response.status_code != 200:
-            raise RuntimeError(f'Alternative endpoint failed: {response.status_code}')
+        if status != 200:
+            raise RuntimeError(f'Alternative endpoint failed: {status}')
 
         # Handle empty response (often indicates insufficient permissions)
-        if not response.text or not response.text.strip():
+        if not body.strip():
             raise RuntimeError('Alternative endpoint returned empty response (may indicate insufficient permissions)')
 
         try:
-            data = response.json()
-        except requests.exceptions.JSONDecodeError as e:
+            data = fast_json_loads(body)
+        except ValueError as e:
             raise RuntimeError(f'Alternative endpoint failed: {e}') from e
 
         return data.get('data', [])
@@ -269,7 +357,9 @@ class LeaveRequestProcessor:
         # This is a polling mechanism to check if the action completed
         save_url = f'{self.SCREEN_ACTION_URL}/expert.leave-approve/{record_id}/save/none'
 
-        max_attempts = 5
+        # Poll quickly at first, backing off (with jitter) up to 2s between attempts
+        max_attempts = 7
+        delay = 0.1
         for attempt in range(max_attempts):
             response = self.session.get(save_url)
             if response.status_code == 200:
@@ -278,7 +368,11 @@ class LeaveRequestProcessor:
                 if status in ['completed', 'success'] or not data:
                     self._log(f'  Approval completed (attempt {attempt + 1})')
                     return True
-            time.sleep(0.5)
+            if attempt == max_attempts - 1:
+                break
+            # 429s never get here: the session's retry policy already waits out Retry-After
+            time.sleep(delay + random.uniform(0, delay * 0.1))
+            delay = min(delay * 2, 2.0)
 
         self._log('  Warning: Screen action did not confirm completion')
         return False
@@ -329,42 +423,57 @@ class LeaveRequestProcessor:
             'recordId': record_id,
         }
 
-        response = self.session.get(self.ACTION_BUTTON_URL, params=params)
+        status, body = self._conditional_get(self.ACTION_BUTTON_URL, params=params)
 
-        if response.status_code != 200:
-            raise RuntimeError(f'Failed to get request details: {response.status_code}')
+        if status != 200:
+            raise RuntimeError(f'Failed to get request details: {status}')
+
+        return fast_json_loads(body)
 
-        return response.json()
+
+# Field names vary between endpoints; the first non-empty alias wins
+FIELD_ALIASES = {
+    'employee': ('employeeName', 'fullName', 'FULLNAME'),
+    'leave_type': ('leaveType', 'leaveType_DISPLAY', 'LEAVETYPE'),
+    'start_date': ('startDate', 'START_DATE'),
+    'end_date': ('endDate', 'END_DATE'),
+    'status': ('status', 'STATUS'),
+    'record_id': ('id', 'recordId', 'ID'),
+    'manager': ('manager', 'MANAGER'),
+    'pending_days': ('pendingDays', 'PENDINGDAYS'),
+    'details': ('details', 'DETAILS'),
+}
+
+
+def _preview(body: bytes, length: int) -> str:
+    """The start of a response body, for error messages."""
+    return body[:length].decode('utf-8', errors='replace')
+
+
+def _first(request: dict, field: str, default='Unknown'):
+    for key in FIELD_ALIASES[field]:
+        value = request.get(key)
+        if value:
+            return value
+    return default
 
 
 def format_leave_request(request: dict) -> str:
     """Format a leave request record for display."""
-    lines = []
-
-    # Extract common fields (field names vary between endpoints)
-    employee = request.get('employeeName') or request.get('fullName') or request.get('FULLNAME', 'Unknown')
-    leave_type = request.get('leaveType') or request.get('leaveType_DISPLAY') or request.get('LEAVETYPE', 'Unknown')
-    start_date = request.get('startDate') or request.get('START_DATE', 'Unknown')
-    end_date = request.get('endDate') or request.get('END_DATE', 'Unknown')
-    status = request.get('status') or request.get('STATUS', 'Unknown')
-    record_id = request.get('id') or request.get('recordId') or request.get('ID', 'Unknown')
-    manager = request.get('manager') or request.get('MANAGER', '')
-    pending_days = request.get('pendingDays') or request.get('PENDINGDAYS', '')
-    details = request.get('details') or request.get('DETAILS', '')
-
-    lines.append(f'  Employee: {employee}')
-    lines.append(f'  Leave Type: {leave_type}')
-    lines.append(f'  Dates: {start_date} to {end_date}')
-    lines.append(f'  Status: {status}')
-    if manager:
-        lines.append(f'  Manager: {manager}')
-    if pending_days:
-        lines.append(f'  Pending Days: {pending_days}')
-    if details:
-        lines.append(f'  Details: {details}')
-    lines.append(f'  Record ID: {record_id}')
-
-    return '\n'.join(lines)
+    manager = _first(request, 'manager', '')
+    pending_days = _first(request, 'pending_days', '')
+    details = _first(request, 'details', '')
+
+    return '\n'.join([
+        f'  Employee: {_first(request, "employee")}',
+        f'  Leave Type: {_first(request, "leave_type")}',
+        f'  Dates: {_first(request, "start_date")} to {_first(request, "end_date")}',
+        f'  Status: {_first(request, "status")}',
+        *([f'  Manager: {manager}'] if manager else []),
+        *([f'  Pending Days: {pending_days}'] if pending_days else []),
+        *([f'  Details: {details}'] if details else []),
+        f'  Record ID: {_first(request, "record_id")}',
+    ])
 
 
 def cmd_list(processor: LeaveRequestProcessor, args: argparse.Namespace):
@@ -403,14 +512,72 @@ def cmd_list(processor: LeaveRequestProcessor, args: argparse.Namespace):
         print()
 
 
+def _record_ids(args: argparse.Namespace) -> list[str]:
+    """Record IDs from the command line and --from-file, in order, without duplicates."""
+    record_ids = list(args.record_ids)
+    if args.from_file:
+        for line in Path(args.from_file).read_text(encoding='utf-8').splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                record_ids.append(line)
+    return list(dict.fromkeys(record_ids))
+
+
+def _process_batch(record_ids: list[str], process) -> list[tuple[str, bool, str]]:
+    """
+    Run process(record_id) for every ID, one at a time. Returns (record_id,
+    succeeded, error) in input order.
+
+    Deliberately serial: these calls change real leave records, and the
+    server rotates the EMEASMSESSION cookie on every response, so concurrent
+    calls through the one session could send a stale cookie.
+    """
+    results = []
+    for record_id in record_ids:
+        try:
+            results.append((record_id, bool(process(record_id)), ''))
+        except Exception as e:
+            results.append((record_id, False, str(e)))
+    return results
+
+
+def _print_batch_summary(results: list[tuple[str, bool, str]], done: str) -> None:
+    print()
+    print('Summary')
+    print('-' * 60)
+    for record_id, succeeded, error in results:
+        outcome = done if succeeded else f'FAILED {error}'.rstrip()
+        print(f'  {record_id:<38} {outcome}')
+    failed = sum(1 for _, succeeded, _ in results if not succeeded)
+    print(f'\n{len(results) - failed} of {len(results)} {done}, {failed} failed')
+
+
 def cmd_approve(processor: LeaveRequestProcessor, args: argparse.Namespace):
-    """Approve a leave request."""
+    """Approve one or more leave requests."""
+    record_ids = _record_ids(args)
+    if not record_ids:
+        print('Error: no record IDs given')
+        sys.exit(1)
+
+    if len(record_ids) > 1:
+        print()
+        print(f'Approving {len(record_ids)} leave requests')
+        print('=' * 60)
+        results = _process_batch(
+            record_ids,
+            lambda record_id: processor.approve_request(record_id=record_id, comments=args.comments or ''),
+        )
+        _print_batch_summary(results, 'approved')
+        if not all(succeeded for _, succeeded, _ in results):
+            sys.exit(1)
+        return
+
     print()
-    print(f'Approving leave request: {args.record_id}')
+    print(f'Approving leave request: {record_ids[0]}')
     print('=' * 60)
 
     success = processor.approve_request(
-        record_id=args.record_id,
+        record_id=record_ids[0],
         comments=args.comments or '',
     )
 
@@ -422,17 +589,35 @@ def cmd_approve(processor: LeaveRequestProcessor, args: argparse.Namespace):
 
 
 def cmd_reject(processor: LeaveRequestProcessor, args: argparse.Namespace):
-    """Reject a leave request."""
-    print()
-    print(f'Rejecting leave request: {args.record_id}')
-    print('=' * 60)
-
+    """Reject one or more leave requests."""
     if not args.reason:
         print('Error: --reason is required when rejecting a leave request')
         sys.exit(1)
 
+    record_ids = _record_ids(args)
+    if not record_ids:
+        print('Error: no record IDs given')
+        sys.exit(1)
+
+    if len(record_ids) > 1:
+        print()
+        print(f'Rejecting {len(record_ids)} leave requests')
+        print('=' * 60)
+        results = _process_batch(
+            record_ids,
+            lambda record_id: processor.reject_request(record_id=record_id, reason=args.reason),
+        )
+        _print_batch_summary(results, 'rejected')
+        if not all(succeeded for _, succeeded, _ in results):
+            sys.exit(1)
+        return
+
+    print()
+    print(f'Rejecting leave request: {record_ids[0]}')
+    print('=' * 60)
+
     success = processor.reject_request(
-        record_id=args.record_id,
+        record_id=record_ids[0],
         reason=args.reason,
     )
 
@@ -478,13 +663,15 @@ def main():
     list_parser.add_argument('--employee', metavar='NAME', help='Filter by employee name')
 
     # approve command
-    approve_parser = subparsers.add_parser('approve', help='Approve a leave request')
-    approve_parser.add_argument('record_id', help='Record ID of the leave request')
+    approve_parser = subparsers.add_parser('approve', help='Approve one or more leave requests')
+    approve_parser.add_argument('record_ids', nargs='*', metavar='record_id', help='Record ID(s) of the leave request(s)')
+    approve_parser.add_argument('--from-file', metavar='PATH', help='Read further record IDs from a file, one per line')
     approve_parser.add_argument('--comments', '-c', help='Optional approval comments')
 
     # reject command
-    reject_parser = subparsers.add_parser('reject', help='Reject a leave request')
-    reject_parser.add_argument('record_id', help='Record ID of the leave request')
+    reject_parser = subparsers.add_parser('reject', help='Reject one or more leave requests')
+    reject_parser.add_argument('record_ids', nargs='*', metavar='record_id', help='Record ID(s) of the leave request(s)')
+    reject_parser.add_argument('--from-file', metavar='PATH', help='Read further record IDs from a file, one per line')
     reject_parser.add_argument('--reason', '-r', required=True, help='Reason for rejection (required)')
 
     # show command
@@ -5,6 +5,8 @@
 #   "playwright",
 #   "playwright-stealth",
 #   "python-dotenv",
+#   "orjson",
+#   "brotli",
 # ]
 # ///
 """
@@ -19,71 +21,224 @@ Usage:
     uv run payslip_sync.py --visible    # Show browser during auth
     uv run payslip_sync.py --clear-cache # Force fresh auth
     uv run payslip_sync.py --list       # List cached payslips
+    uv run payslip_sync.py --http2      # Multiplex downloads over HTTP/2 (needs httpx[http2])
 """
 
 from __future__ import annotations
 
 import argparse
-import json
+import functools
+import hashlib
+import os
+import re
+import sqlite3
 import sys
-import time
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import requests
 
 from ihcm_auth import (
+    HTTPX_AVAILABLE,
+    RateLimiter,
     SessionCache,
+    ThreadSessions,
     create_authenticated_session_with_browser,
+    create_session_h2,
+    ensure_pool_size,
+    fast_json_dumps,
+    fast_json_loads,
+    sync_cookies_from_h2,
 )
 
-# Playwright types for type hints
+# httpx is optional - only used with --http2
 try:
-    from playwright.sync_api import BrowserContext
+    import httpx
+
+    TRANSPORT_ERRORS: tuple[type[Exception], ...] = (requests.RequestException, httpx.HTTPError)
 except ImportError:
-    BrowserContext = type(None)
+    TRANSPORT_ERRORS = (requests.RequestException,)
+
+if TYPE_CHECKING:
+    from playwright.sync_api import BrowserContext
 
 IHCM_BASE_URL = "https://ihcm.adp.com/whrmux/webapi"
 
+# /v1_0/O/A/payStatement/{encodedId} - the base64 ID may itself contain '/'
+PAY_DETAIL_HREF_RE = re.compile(r"/payStatement/(.+)")
+# /v1_0/O/A/payStatement/{statement_id}/images/{image_id}.pdf
+STATEMENT_IMAGE_HREF_RE = re.compile(r"/payStatement/(.*?)/images/(.*)")
+
+
+@dataclass(slots=True)
+class PayMeta:
+    """The identifying fields of a payslip record, extracted in one pass."""
+
+    encoded_id: str
+    pay_date: str
+    statement_id: str | None
+    image_id: str | None
+
 
 class PayslipIndex:
     """
-    Manages the index.json file that tracks all synced payslips.
+    Tracks all synced payslips in a SQLite database (index.sqlite).
 
     The index stores metadata about each payslip including its encoded ID,
-    pay date, and paths to the cached JSON/PDF files.
+    pay date, and paths to the cached JSON/PDF files. Each download is one
+    row insert, committed straight away, so progress survives a crash.
+    index.json is still exported once per run, on close() after a save(),
+    for anything that reads it, and is imported once when upgrading.
     """
 
     def __init__(self, cache_dir: Path) -> None:
         self.cache_dir = cache_dir
         self.index_file = cache_dir / "index.json"
-        self._data: dict[str, Any] = {}
+        self.db_file = cache_dir / "index.sqlite"
+        self._db: sqlite3.Connection | None = None
+        # Relative paths of the payslip files on disk, scanned once by load()
+        self._files: set[str] = set()
+        # Timestamp recorded as cached_at for everything indexed this run
+        self._loaded_at = ""
+        # Set by save(), so close() knows index.json needs exporting
+        self._export_pending = False
 
-    def load(self) -> None:
-        """Load existing index from disk."""
-        if self.index_file.exists():
-            try:
-                self._data = json.loads(self.index_file.read_text())
-            except (json.JSONDecodeError, OSError) as e:
-                print(f"  Warning: Failed to load index: {e}")
-                self._data = {}
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise RuntimeError("Payslip index not loaded - call load() first")
+        return self._db
+
+    def load(self, read_only: bool = False) -> None:
+        """
+        Open the index database, importing index.json on first use.
+
+        With read_only, an existing database is opened without write access
+        and nothing is created on disk; an index.json from before the
+        database existed is read into memory instead.
+        """
+        self.close()
+        self._loaded_at = datetime.now().isoformat()
+        if read_only and self.db_file.exists():
+            self._db = sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True)
+            return
+        if read_only:
+            self._db = sqlite3.connect(":memory:")
         else:
-            self._data = {}
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.db_file)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS payslips (
+                encoded_id TEXT PRIMARY KEY,
+                pay_date TEXT,
+                json_path TEXT,
+                pdf_path TEXT,
+                cached_at TEXT,
+                statement_id TEXT,
+                image_id TEXT,
+                pdf_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        # Indexes created before the PDF IDs and hashes were recorded lack their columns
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(payslips)")}
+        for column in ("statement_id", "image_id", "pdf_hash"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE payslips ADD COLUMN {column} TEXT")
 
-        # Initialize structure if empty
-        if "payslips" not in self._data:
-            self._data["payslips"] = {}
-        if "total_count" not in self._data:
-            self._data["total_count"] = 0
+        has_rows = self.db.execute("SELECT 1 FROM payslips LIMIT 1").fetchone()
+        if not has_rows and self.index_file.exists():
+            self._import_json()
+
+        if not read_only:
+            self._files = self._scan_files()
+
+    def _scan_files(self) -> set[str]:
+        """
+        Collect the relative paths of all files under cache_dir in one walk,
+        so existence checks don't cost a stat() per payslip.
+        """
+        files: set[str] = set()
+        pending = [("", str(self.cache_dir))]
+        while pending:
+            rel_dir, abs_dir = pending.pop()
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    rel_path = os.path.join(rel_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append((rel_path, entry.path))
+                    else:
+                        files.add(rel_path)
+        return files
+
+    def has_file(self, rel_path: str) -> bool:
+        """Check whether a path relative to cache_dir existed at load() or was indexed since."""
+        return rel_path in self._files
+
+    def _import_json(self) -> None:
+        """Carry over an index.json written before the SQLite index existed."""
+        try:
+            data = fast_json_loads(self.index_file.read_bytes())
+        except (ValueError, OSError) as e:
+            print(f"  Warning: Failed to load index: {e}")
+            return
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO payslips"
+                " (encoded_id, pay_date, json_path, pdf_path, cached_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        encoded_id,
+                        entry.get("pay_date"),
+                        entry.get("json_path"),
+                        entry.get("pdf_path"),
+                        entry.get("cached_at"),
+                    )
+                    for encoded_id, entry in data.get("payslips", {}).items()
+                ],
+            )
+            if data.get("last_sync"):
+                self._set_meta("last_sync", data["last_sync"])
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
 
     def save(self) -> None:
-        """Persist index to disk."""
-        self._data["last_sync"] = datetime.now().isoformat()
-        self._data["total_count"] = len(self._data.get("payslips", {}))
+        """Record the sync time; index.json is exported when the index is closed."""
+        with self.db:
+            self._set_meta("last_sync", datetime.now().isoformat())
+        self._export_pending = True
+
+    def _export_json(self) -> None:
+        """Write the whole index out to index.json."""
+        payslips = self.get_all()
+        data = {
+            "payslips": payslips,
+            "total_count": len(payslips),
+            "last_sync": self.last_sync,
+        }
+        _write_durable(self.index_file, fast_json_dumps(data, indent=True))
 
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.index_file.write_text(json.dumps(self._data, indent=2))
+    def close(self) -> None:
+        """Export index.json if the index was saved, then close the database."""
+        if self._db is not None:
+            if self._export_pending:
+                self._export_json()
+                self._export_pending = False
+            self._db.close()
+            self._db = None
 
     def is_cached(self, encoded_id: str, verify_exists: bool = True) -> bool:
         """
@@ -93,21 +248,18 @@ class PayslipIndex:
             encoded_id: The encoded payslip ID
             verify_exists: If True, also verify the JSON file exists on disk
         """
-        if encoded_id not in self._data.get("payslips", {}):
+        row = self.db.execute(
+            "SELECT json_path FROM payslips WHERE encoded_id = ?", (encoded_id,)
+        ).fetchone()
+        if row is None:
             return False
 
         if not verify_exists:
             return True
 
         # Verify the JSON file actually exists on disk
-        entry = self._data["payslips"][encoded_id]
-        json_path = entry.get("json_path")
-        if json_path:
-            full_path = self.cache_dir / json_path
-            if not full_path.exists():
-                return False
-
-        return True
+        json_path = row[0]
+        return not json_path or self.has_file(json_path)
 
     def mark_cached(
         self,
@@ -115,23 +267,74 @@ class PayslipIndex:
         pay_date: str,
         json_path: str,
         pdf_path: str | None = None,
+        statement_id: str | None = None,
+        image_id: str | None = None,
+        pdf_hash: str | None = None,
     ) -> None:
-        """Record a downloaded payslip in the index."""
-        self._data["payslips"][encoded_id] = {
-            "pay_date": pay_date,
-            "json_path": json_path,
-            "pdf_path": pdf_path,
-            "cached_at": datetime.now().isoformat(),
-        }
+        """
+        Record a downloaded payslip in the index, along with the IDs its PDF
+        is fetched by so a later --pdf-only run needn't query for them, and
+        the PDF's content hash so a damaged copy can be detected.
+        """
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO payslips VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    encoded_id,
+                    pay_date,
+                    json_path,
+                    pdf_path,
+                    self._loaded_at,
+                    statement_id,
+                    image_id,
+                    pdf_hash,
+                ),
+            )
+        self._files.add(json_path)
+        if pdf_path:
+            self._files.add(pdf_path)
+
+    def set_pdf_path(self, encoded_id: str, pdf_path: str, pdf_hash: str) -> None:
+        """Record the PDF downloaded for an already-indexed payslip."""
+        with self.db:
+            self.db.execute(
+                "UPDATE payslips SET pdf_path = ?, pdf_hash = ? WHERE encoded_id = ?",
+                (pdf_path, pdf_hash, encoded_id),
+            )
+        self._files.add(pdf_path)
+
+    def set_pdf_ids(self, encoded_id: str, statement_id: str, image_id: str) -> None:
+        """Record the IDs an indexed payslip's PDF is downloaded by."""
+        with self.db:
+            self.db.execute(
+                "UPDATE payslips SET statement_id = ?, image_id = ? WHERE encoded_id = ?",
+                (statement_id, image_id, encoded_id),
+            )
 
     def get_all(self) -> dict[str, dict[str, Any]]:
         """Return all indexed payslips."""
-        return self._data.get("payslips", {})
+        rows = self.db.execute(
+            "SELECT encoded_id, pay_date, json_path, pdf_path, cached_at,"
+            " statement_id, image_id, pdf_hash FROM payslips"
+        )
+        return {
+            row[0]: {
+                "pay_date": row[1],
+                "json_path": row[2],
+                "pdf_path": row[3],
+                "cached_at": row[4],
+                "statement_id": row[5],
+                "image_id": row[6],
+                "pdf_hash": row[7],
+            }
+            for row in rows
+        }
 
     @property
     def last_sync(self) -> str | None:
         """Return the timestamp of the last sync."""
-        return self._data.get("last_sync")
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last_sync'").fetchone()
+        return row[0] if row else None
 
 
 class PayslipSyncer:
@@ -146,18 +349,100 @@ class PayslipSyncer:
     QUERY_API = f"{IHCM_BASE_URL}/api/pay/pay-statement-query"
     DETAIL_API = f"{IHCM_BASE_URL}/api/pay/pay-statement"
 
+    # PDFs are streamed to disk in chunks of this size
+    PDF_CHUNK_SIZE = 64 * 1024
+
+    # Payslips downloaded at once; the limiter backs off if the server pushes back
+    DEFAULT_WORKERS = 8
+
     def __init__(
         self,
         session: requests.Session,
         browser_context: BrowserContext | None = None,
-        delay_seconds: float = 0.2,
+        workers: int = DEFAULT_WORKERS,
+        limiter: RateLimiter | None = None,
+        http2: bool = False,
     ) -> None:
         self.session = session
+        # Each worker thread sends through its own copy of the session, so
+        # their rotating session cookies don't overwrite one another
+        self._sessions = ThreadSessions(session)
         self.browser_context = browser_context
-        self.delay_seconds = delay_seconds
+        self.workers = workers
+        # Keep a warm connection per worker so none has to re-handshake
+        ensure_pool_size(session, workers)
+        # With http2, detail and PDF GETs share one multiplexed connection.
+        # The client is built on the first GET, once the payslip query POSTs
+        # (which rotate the session cookie) are done, so it starts from the
+        # session's latest cookies; from then on only the client is used.
+        if http2 and not HTTPX_AVAILABLE:
+            raise RuntimeError(
+                "httpx is not installed. Install with:\n  uv pip install 'httpx[http2]'"
+            )
+        self.http2 = http2
+        self.client: Any = None
+        self._client_lock = threading.Lock()
+        # Paced by the server's rate limit headers rather than a fixed sleep
+        self.limiter = limiter or RateLimiter(max_concurrency=workers)
         self.index = PayslipIndex(self.CACHE_DIR)
+        # Inline remarks from the download running on each worker thread
+        self._local = threading.local()
+        # Payslips can share a pay date, and so a file name: jobs for the same
+        # file take its lock so they run one after another
+        self._path_locks: dict[Path, threading.Lock] = {}
+        self._path_locks_guard = threading.Lock()
+
+    def _note(self, text: str) -> None:
+        """Add an inline remark to the current payslip's progress line."""
+        notes = getattr(self._local, "notes", None)
+        if notes is None:
+            print(text, end="")
+        else:
+            notes.append(text)
+
+    def close(self) -> None:
+        """Close the index and the HTTP/2 client, if one was opened."""
+        self.index.close()
+        self._sessions.merge()
+        if self.client:
+            sync_cookies_from_h2(self.client, self.session)
+            self.client.close()
+
+    def _get(
+        self, url: str, allow_redirects: bool = True, stream: bool = False, **kwargs: Any
+    ) -> Any:
+        """
+        GET through the shared rate limiter, over HTTP/2 when enabled.
 
-    def _check_session_valid(self, response: requests.Response) -> None:
+        Returns a requests or httpx response; callers only use the attributes
+        the two have in common (see _iter_chunks for streamed bodies).
+        """
+        self.limiter.wait()
+        try:
+            if self.http2:
+                client = self._http2_client()
+                request = client.build_request("GET", url, **kwargs)
+                response = client.send(
+                    request, stream=stream, follow_redirects=allow_redirects
+                )
+            else:
+                response = self._sessions.get().get(
+                    url, allow_redirects=allow_redirects, stream=stream, **kwargs
+                )
+        except Exception:
+            self.limiter.update(None)
+            raise
+        self.limiter.update(response)
+        return response
+
+    def _http2_client(self) -> Any:
+        """Return the HTTP/2 client, copying the session's cookies on first use."""
+        with self._client_lock:
+            if self.client is None:
+                self.client = create_session_h2(self.session, self.workers)
+            return self.client
+
+    def _check_session_valid(self, response: Any) -> None:
         """Raise an error if the session has expired."""
         if response.status_code == 401:
             raise RuntimeError(
@@ -166,93 +451,148 @@ class PayslipSyncer:
             )
 
         # Check for HTML login page response
-        content = response.text.strip()
-        if content.startswith("<!") or content.startswith("<html"):
+        if response.content[:16].lstrip().startswith((b"<!", b"<html")):
             raise RuntimeError(
                 "Session expired - received login page instead of JSON.\n"
                 "Try running with --clear-cache to force fresh authentication."
             )
 
-    def list_all_payslips(self) -> list[dict[str, Any]]:
+    # The API requires filter array with date range to fetch all history
+    # Without filters, the API defaults to "Last 3" payslips
+    QUERY_FILTER = [
+        {
+            "id": 6,
+            "operator": "lteq",
+            "value": "2019-01-01",
+            "property": "dateFilter",
+            "boolean": "OR",
+            "group": 2,
+            "groupName": "Date range",
+            "displayValue": "Start date",
+        },
+        {
+            "id": 7,
+            "operator": "gteq",
+            "value": "2030-12-31",
+            "property": "dateFilter",
+            "boolean": "OR",
+            "group": 2,
+            "groupName": "Date range",
+            "displayValue": "End date",
+        },
+    ]
+    QUERY_PAGE_SIZE = 100
+
+    def _query_page(self, start: int) -> tuple[list[dict[str, Any]], int] | None:
         """
-        Fetch all available payslips from the API.
+        Fetch one page of the payslip list starting at the given offset.
 
-        Returns a list of payslip metadata including encoded IDs and pay dates.
-        """
-        all_payslips: list[dict[str, Any]] = []
-        start = 0
-        batch_size = 100
-
-        while True:
-            # The API requires filter array with date range to fetch all history
-            # Without filters, the API defaults to "Last 3" payslips
-            payload = {
-                "filter": [
-                    {
-                        "id": 6,
-                        "operator": "lteq",
-                        "value": "2019-01-01",
-                        "property": "dateFilter",
-                        "boolean": "OR",
-                        "group": 2,
-                        "groupName": "Date range",
-                        "displayValue": "Start date",
-                    },
-                    {
-                        "id": 7,
-                        "operator": "gteq",
-                        "value": "2030-12-31",
-                        "property": "dateFilter",
-                        "boolean": "OR",
-                        "group": 2,
-                        "groupName": "Date range",
-                        "displayValue": "End date",
-                    },
-                ],
-                "orderBy": "PAYCHECKDATE DESC",
-                "limit": batch_size,
-                "showParameterics": False,
-                "start": start,
-                "end": start + batch_size - 1,
-            }
+        Returns (payslips, total), or None if the response has an unexpected
+        structure.
+        """
+        payload: dict[str, Any] = {
+            "filter": self.QUERY_FILTER,
+            "orderBy": "PAYCHECKDATE DESC",
+            "limit": self.QUERY_PAGE_SIZE,
+            "showParameterics": False,
+            "start": start,
+            "end": start + self.QUERY_PAGE_SIZE - 1,
+        }
 
-            response = self.session.post(self.QUERY_API, json=payload)
-            self._check_session_valid(response)
+        self.limiter.wait()
+        try:
+            response = self._sessions.get().post(self.QUERY_API, json=payload)
+        except Exception:
+            self.limiter.update(None)
+            raise
+        self.limiter.update(response)
+        self._check_session_valid(response)
 
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"Failed to query payslips: HTTP {response.status_code}\n"
-                    f"Response: {response.text[:500]}"
-                )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Failed to query payslips: HTTP {response.status_code}\n"
+                f"Response: {response.text[:500]}"
+            )
 
-            try:
-                data = response.json()
-            except requests.exceptions.JSONDecodeError as e:
-                raise RuntimeError(
-                    f"Invalid JSON response from payslip query: {e}"
-                ) from e
-
-            # Extract payslips from response
-            if isinstance(data, list):
-                batch = data
-                total = len(data)
-            elif isinstance(data, dict) and "data" in data:
-                batch = data["data"]
-                total = data.get("total", len(batch))
-            else:
-                print(f"  Warning: Unexpected response structure: {type(data)}")
-                if isinstance(data, dict):
-                    print(f"  Keys: {list(data.keys())}")
-                break
+        try:
+            data = fast_json_loads(response.content)
+        except ValueError as e:
+            raise RuntimeError(
+                f"Invalid JSON response from payslip query: {e}"
+            ) from e
 
-            all_payslips.extend(batch)
+        # Extract payslips from response
+        if isinstance(data, list):
+            return data, len(data)
+        if isinstance(data, dict) and "data" in data:
+            return data["data"], data.get("total", len(data["data"]))
 
-            # Check if we've fetched all payslips
-            if len(all_payslips) >= total or len(batch) == 0:
-                break
+        print(f"  Warning: Unexpected response structure: {type(data)}")
+        if isinstance(data, dict):
+            print(f"  Keys: {list(data.keys())}")
+        return None
 
-            start += len(batch)
-            time.sleep(0.1)  # Small delay between pagination requests
+    def list_all_payslips(self) -> list[dict[str, Any]]:
+        """
+        Fetch all available payslips from the API.
+
+        The first page reports the total, so the remaining pages are then
+        requested concurrently, up to `workers` ahead of the page being
+        collected. If a page comes back short or unexpected, the requests
+        after it are dropped and the rest is read serially from there.
+        Returns a list of payslip metadata including encoded IDs and pay
+        dates.
+        """
+        try:
+            return self._list_pages()
+        finally:
+            # The downloads then start from the listing's newest cookies
+            self._sessions.merge()
+
+    def _list_pages(self) -> list[dict[str, Any]]:
+        first = self._query_page(0)
+        if first is None:
+            return []
+        batch, total = first
+        all_payslips = list(batch)
+        # Later pages step by what the server actually returned per page
+        step = start = len(all_payslips)
+
+        if step and step < total:
+            offsets = iter(range(step, total, step))
+            pending: deque[tuple[int, Future]] = deque()
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                def fill() -> None:
+                    while len(pending) < self.workers:
+                        offset = next(offsets, None)
+                        if offset is None:
+                            return
+                        pending.append((offset, executor.submit(self._query_page, offset)))
+
+                try:
+                    fill()
+                    while pending:
+                        offset, future = pending.popleft()
+                        page = future.result()
+                        if page is None:
+                            break
+                        all_payslips.extend(page[0])
+                        start = offset + len(page[0])
+                        if len(page[0]) < step:
+                            break
+                        fill()
+                finally:
+                    # Don't wait on pages nobody will read
+                    for _, later in pending:
+                        later.cancel()
+
+        while 0 < start < total:
+            page = self._query_page(start)
+            if page is None or not page[0]:
+                break
+            all_payslips.extend(page[0])
+            start += len(page[0])
 
         return all_payslips
 
@@ -263,7 +603,7 @@ class PayslipSyncer:
         The encoded_id is a base64-encoded compound key.
         """
         url = f"{self.DETAIL_API}/{encoded_id}"
-        response = self.session.get(url)
+        response = self._get(url)
         self._check_session_valid(response)
 
         if response.status_code == 404:
@@ -274,7 +614,7 @@ class PayslipSyncer:
                 f"Failed to fetch payslip detail: HTTP {response.status_code}"
             )
 
-        return response.json()
+        return fast_json_loads(response.content)
 
     def _fetch_pdf_via_playwright(self, pdf_url: str) -> bytes | None:
         """
@@ -294,14 +634,16 @@ class PayslipSyncer:
             page.goto(
                 "https://ihcm.adp.com/whrmux/web/me/pay-and-statements",
                 timeout=60000,
-                wait_until="networkidle",
+                wait_until="domcontentloaded",
             )
 
-            # Wait for page to stabilize
-            page.wait_for_timeout(2000)
-
-            # Get the bearer token from sessionStorage
-            bearer_token = page.evaluate("() => sessionStorage.getItem('iHcmBearerToken')")
+            # The SPA stores the bearer token once it has bootstrapped - wait
+            # for that rather than for the network to go idle
+            bearer_token = page.wait_for_function(
+                "() => sessionStorage.getItem('iHcmBearerToken')",
+                timeout=30000,
+                polling=200,
+            ).json_value()
 
             # Use JavaScript fetch with credentials and auth header to get the PDF
             result = page.evaluate(
@@ -345,26 +687,26 @@ class PayslipSyncer:
                 err = result["error"]
                 url = result.get("url", "")
                 if "login" in url.lower() or "signin" in url.lower():
-                    print(" (PDF: SSO redirect)", end="")
+                    self._note(" (PDF: SSO redirect)")
                 else:
-                    print(f" (PDF fetch: {err[:40]})", end="")
+                    self._note(f" (PDF fetch: {err[:40]})")
                 return None
 
             if result.get("success"):
                 pdf_bytes = bytes(result["bytes"])
                 if pdf_bytes and pdf_bytes[:4] == b"%PDF":
                     return pdf_bytes
-                print(" (PDF: not a valid PDF)", end="")
+                self._note(" (PDF: not a valid PDF)")
                 return None
 
-            print(" (PDF: unknown result)", end="")
+            self._note(" (PDF: unknown result)")
             return None
 
         except Exception as e:
             error_msg = str(e)
             if len(error_msg) > 50:
                 error_msg = error_msg[:50] + "..."
-            print(f" (PDF error: {error_msg})", end="")
+            self._note(f" (PDF error: {error_msg})")
             return None
         finally:
             if page:
@@ -373,122 +715,131 @@ class PayslipSyncer:
                 except Exception:
                     pass
 
-    def _fetch_pdf_via_requests(self, pdf_url: str) -> bytes | None:
+    def _fetch_pdf_via_requests(self, pdf_url: str, dest_path: Path) -> str | None:
         """
-        Download PDF using requests session.
+        Download PDF using requests session, streaming it to dest_path.
 
         This will likely fail for PDFs protected by SiteMinder SSO.
         """
         try:
-            response = self.session.get(pdf_url, timeout=30, allow_redirects=False)
-
-            # Follow redirects manually, up to 10 hops
-            redirect_count = 0
-            while response.status_code in (301, 302, 303, 307, 308) and redirect_count < 10:
-                redirect_url = response.headers.get("Location")
-                if not redirect_url:
-                    break
-                # Handle relative URLs
-                if redirect_url.startswith("/"):
-                    from urllib.parse import urlparse
-
-                    parsed = urlparse(pdf_url)
-                    redirect_url = f"{parsed.scheme}://{parsed.netloc}{redirect_url}"
-                response = self.session.get(redirect_url, timeout=30, allow_redirects=False)
-                redirect_count += 1
-
-        except requests.RequestException as e:
-            print(f" (PDF failed: {type(e).__name__})", end="")
+            # Redirects are followed by the HTTP client, reusing pooled connections
+            response = self._get(pdf_url, timeout=30, stream=True)
+        except TRANSPORT_ERRORS as e:
+            self._note(f" (PDF failed: {type(e).__name__})")
             return None
 
-        if response.status_code != 200:
-            print(f" (HTTP {response.status_code})", end="")
+        try:
+            if response.status_code != 200:
+                self._note(f" (HTTP {response.status_code})")
+                return None
+
+            content_type = response.headers.get("Content-Type", "")
+            if "application/pdf" not in content_type and "octet-stream" not in content_type:
+                self._note(f" (bad content-type: {content_type[:30]})")
+                return None
+
+            return self._stream_to_file(response, dest_path)
+        except TRANSPORT_ERRORS as e:
+            self._note(f" (PDF failed: {type(e).__name__})")
             return None
+        finally:
+            response.close()
 
-        content_type = response.headers.get("Content-Type", "")
-        if "application/pdf" not in content_type and "octet-stream" not in content_type:
-            print(f" (bad content-type: {content_type[:30]})", end="")
+    def _stream_to_file(self, response: Any, dest_path: Path) -> str | None:
+        """
+        Write a streamed PDF body to dest_path chunk by chunk, so the whole
+        file is never held in memory. The %PDF magic is checked on the first
+        chunk; the file only appears under its final name once complete.
+
+        Returns the content hash of the file, computed as it is written.
+        (There is no zero-copy os.sendfile() shortcut to take here: the API
+        is HTTPS-only, so the bytes are decrypted in-process anyway, and
+        each chunk passes through the hasher.)
+        """
+        chunks = _iter_chunks(response, self.PDF_CHUNK_SIZE)
+        first = next(chunks, b"")
+        if not first.startswith(b"%PDF"):
+            self._note(" (PDF: not a valid PDF)")
             return None
 
-        return response.content
+        hasher = _pdf_hasher()
 
-    def fetch_payslip_pdf(self, pdf_url: str) -> bytes | None:
+        # Named after the writing thread, so no other download writes into it
+        partial = dest_path.with_name(f"{dest_path.name}.{threading.get_ident()}.part")
+        try:
+            with open(partial, "wb") as f:
+                f.write(first)
+                hasher.update(first)
+                for chunk in chunks:
+                    f.write(chunk)
+                    hasher.update(chunk)
+                # On disk before the rename, so a crash can't leave an empty PDF
+                f.flush()
+                os.fsync(f.fileno())
+            partial.replace(dest_path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return hasher.hexdigest()
+
+    def fetch_payslip_pdf(self, pdf_url: str, dest_path: Path) -> str | None:
         """
-        Download the PDF for a payslip from the given URL.
+        Download the PDF for a payslip from the given URL to dest_path,
+        whose directory must already exist.
 
         Uses the /whrmux/webapi/api/pay/payslip/file endpoint which works
         with standard Bearer token authentication (no SSO issues).
 
-        Returns the PDF bytes or None if download fails.
+        Returns the saved PDF's content hash, or None if the download failed.
         """
         if not pdf_url:
             return None
 
         # The API endpoint works with standard requests session
         # (Bearer token + cookies are already configured)
-        return self._fetch_pdf_via_requests(pdf_url)
-
-    def _get_pay_date(self, payslip: dict[str, Any]) -> str:
-        """Extract the pay date from a payslip record."""
-        # Try common field names
-        for field in ["payDate", "pay_date", "paymentDate", "date", "periodEndDate"]:
-            if field in payslip:
-                date_val = payslip[field]
-                if isinstance(date_val, str):
-                    # Return just the date portion if it's a datetime string
-                    return date_val.split("T")[0]
-        return "unknown"
-
-    def _get_encoded_id(self, payslip: dict[str, Any]) -> str:
-        """Extract the encoded ID from a payslip record."""
-        # Primary method: extract from payDetailUri.href
-        # Format: /v1_0/O/A/payStatement/{encodedId}
-        if "payDetailUri" in payslip:
-            uri = payslip["payDetailUri"]
-            href = uri.get("href") if isinstance(uri, dict) else uri
-            if href and "/payStatement/" in href:
-                return href.split("/payStatement/")[1]
+        return self._fetch_pdf_via_requests(pdf_url, dest_path)
 
-        # Fallback: try common field names
-        for field in ["id", "encodedId", "encoded_id", "payStatementId"]:
-            if field in payslip and payslip[field]:
-                return str(payslip[field])
-
-        raise ValueError(f"Could not find ID in payslip: {list(payslip.keys())}")
+    # Candidate field names, in order of preference
+    PAY_DATE_FIELDS = ("payDate", "pay_date", "paymentDate", "date", "periodEndDate")
+    ID_FIELDS = ("id", "encodedId", "encoded_id", "payStatementId")
 
-    def _get_pdf_info(self, payslip: dict[str, Any]) -> tuple[str | None, str | None]:
+    def _extract_meta(self, payslip: dict[str, Any]) -> PayMeta:
         """
-        Extract PDF download info from a payslip record.
-
-        Returns (statement_id, image_id) tuple for constructing the API URL.
-        The UI uses /whrmux/webapi/api/pay/payslip/file endpoint.
+        Extract the encoded ID, pay date and PDF IDs from a payslip record.
 
         IMPORTANT: The API has TWO different ID formats:
         - payDetailUri uses base64-encoded IDs
         - statementImageUri uses a different format (GUIDs with underscores)
 
-        The PDF download API requires the ID format from statementImageUri!
-        Format: /v1_0/O/A/payStatement/{statement_id}/images/{image_id}.pdf
+        The encoded ID identifies the payslip (and is what the index stores);
+        the PDF download API requires the IDs from statementImageUri.
+        The UI uses /whrmux/webapi/api/pay/payslip/file endpoint.
         """
-        statement_id = None
-        image_id = None
-
-        # Extract BOTH statement_id AND image_id from statementImageUri
-        # Format: /v1_0/O/A/payStatement/{statement_id}/images/{image_id}.pdf
-        if "statementImageUri" in payslip:
-            uri = payslip["statementImageUri"]
-            href = uri.get("href") if isinstance(uri, dict) else uri
-            if href and "/payStatement/" in href and "/images/" in href:
-                # Extract statement_id (between /payStatement/ and /images/)
-                after_paystatement = href.split("/payStatement/")[1]
-                statement_id = after_paystatement.split("/images/")[0]
+        # Primary method: extract from payDetailUri.href
+        # Format: /v1_0/O/A/payStatement/{encodedId}
+        encoded_id = None
+        href = _href(payslip.get("payDetailUri"))
+        match = PAY_DETAIL_HREF_RE.search(href) if href else None
+        if match:
+            encoded_id = match.group(1)
 
-                # Extract image_id (filename without .pdf extension)
-                filename = href.split("/images/")[1]
-                if filename.endswith(".pdf"):
-                    image_id = filename[:-4]
+        # Fallback: try common field names
+        if not encoded_id:
+            value = next((payslip[f] for f in self.ID_FIELDS if payslip.get(f)), None)
+            if value is None:
+                raise ValueError(f"Could not find ID in payslip: {list(payslip.keys())}")
+            encoded_id = str(value)
+
+        # Return just the date portion if it's a datetime string
+        pay_date = "unknown"
+        for field in self.PAY_DATE_FIELDS:
+            value = payslip.get(field)
+            if isinstance(value, str):
+                pay_date = value.split("T")[0]
+                break
 
-        return statement_id, image_id
+        statement_id, image_id = _pdf_ids(payslip.get("statementImageUri"))
+        return PayMeta(encoded_id, pay_date, statement_id, image_id)
 
     def _build_pdf_api_url(self, statement_id: str, image_id: str) -> str:
         """Build the correct API URL for PDF download."""
@@ -497,18 +848,59 @@ class PayslipSyncer:
             f"?statementId={statement_id}&imageId={image_id}&imageType=pdf"
         )
 
+    def _path_lock(self, path: Path) -> threading.Lock:
+        """Return the lock serialising downloads that write to path."""
+        with self._path_locks_guard:
+            return self._path_locks.setdefault(path, threading.Lock())
+
     def _make_file_path(self, pay_date: str, extension: str) -> Path:
         """Generate the file path for a payslip based on its date."""
-        # Parse the date to extract year and month
-        try:
-            dt = datetime.fromisoformat(pay_date.split("T")[0])
-            year = str(dt.year)
-            month = f"{dt.month:02d}"
-        except ValueError:
-            year = "unknown"
-            month = "unknown"
+        return _month_dir(self.CACHE_DIR, pay_date) / f"{pay_date}.{extension}"
+
+    def _make_dirs(self, pay_dates: Iterable[str]) -> None:
+        """Create the year/month directories for these pay dates, once each."""
+        for directory in {_month_dir(self.CACHE_DIR, d) for d in pay_dates}:
+            directory.mkdir(parents=True, exist_ok=True)
 
-        return self.CACHE_DIR / year / month / f"{pay_date}.{extension}"
+    def _save_pdf(
+        self, pay_date: str, statement_id: str, image_id: str
+    ) -> tuple[str, str] | None:
+        """
+        Download and save one PDF, returning its path relative to CACHE_DIR
+        and its content hash.
+        """
+        pdf_url = self._build_pdf_api_url(statement_id, image_id)
+        pdf_path = self._make_file_path(pay_date, "pdf")
+        with self._path_lock(pdf_path):
+            pdf_hash = self.fetch_payslip_pdf(pdf_url, pdf_path)
+        if not pdf_hash:
+            return None
+        return str(pdf_path.relative_to(self.CACHE_DIR)), pdf_hash
+
+    def _download_detail(self, meta: PayMeta) -> str:
+        """
+        Fetch and save one payslip's JSON detail on a worker thread, returning
+        its path relative to CACHE_DIR.
+        """
+        json_path = self._make_file_path(meta.pay_date, "json")
+        with self._path_lock(json_path):
+            detail = self.fetch_payslip_detail(meta.encoded_id)
+            json_path.write_bytes(fast_json_dumps(detail, indent=True))
+        return str(json_path.relative_to(self.CACHE_DIR))
+
+    def _download_pdf(
+        self, pay_date: str, statement_id: str, image_id: str
+    ) -> tuple[tuple[str, str] | None, str]:
+        """
+        Download one PDF on a worker thread. Returns (pdf, notes): _save_pdf's
+        result (or None) and any inline remarks from the download.
+        """
+        self._local.notes = []
+        try:
+            pdf = self._save_pdf(pay_date, statement_id, image_id)
+            return pdf, "".join(self._local.notes)
+        finally:
+            del self._local.notes
 
     def sync_all(self, skip_pdf: bool = False) -> tuple[int, int, int]:
         """
@@ -536,14 +928,15 @@ class PayslipSyncer:
             return 0, 0, 0
 
         # Find missing payslips
-        missing = []
+        missing: list[PayMeta] = []
         for ps in payslips:
             try:
-                encoded_id = self._get_encoded_id(ps)
-                if not self.index.is_cached(encoded_id):
-                    missing.append(ps)
+                meta = self._extract_meta(ps)
             except ValueError as e:
                 print(f"  Warning: {e}")
+                continue
+            if not self.index.is_cached(meta.encoded_id):
+                missing.append(meta)
 
         already_cached = total_available - len(missing)
         print(f"  Already cached: {already_cached}")
@@ -557,55 +950,80 @@ class PayslipSyncer:
 
         # Download missing payslips
         print()
-        print("Downloading missing payslips...")
+        print(f"Downloading missing payslips ({self.workers} at a time)...")
         newly_downloaded = 0
-
-        for i, ps in enumerate(missing):
-            encoded_id = self._get_encoded_id(ps)
-            pay_date = self._get_pay_date(ps)
-            statement_id, image_id = self._get_pdf_info(ps)
-
-            print(f"  [{i + 1}/{len(missing)}] {pay_date}...", end="", flush=True)
-
+        finished = 0
+        # Workers write straight into these, without a mkdir per file
+        self._make_dirs(meta.pay_date for meta in missing)
+
+        # A payslip's detail and PDF are separate jobs, so both are in flight
+        # at once; their results are paired up again below
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures: dict[Future, tuple[int, str]] = {}
+            parts: list[int] = []
+            for i, meta in enumerate(missing):
+                futures[executor.submit(self._download_detail, meta)] = (i, "json")
+                parts.append(1)
+                if not skip_pdf and meta.statement_id and meta.image_id:
+                    future = executor.submit(
+                        self._download_pdf, meta.pay_date, meta.statement_id, meta.image_id
+                    )
+                    futures[future] = (i, "pdf")
+                    parts[i] = 2
+
+            results: dict[int, dict[str, Any]] = {}
             try:
-                # Fetch detailed JSON
-                detail = self.fetch_payslip_detail(encoded_id)
-
-                # Save JSON
-                json_path = self._make_file_path(pay_date, "json")
-                json_path.parent.mkdir(parents=True, exist_ok=True)
-                json_path.write_text(json.dumps(detail, indent=2))
-
-                # Fetch and save PDF if enabled and we have the required info
-                pdf_rel_path: str | None = None
-                if not skip_pdf and statement_id and image_id:
-                    pdf_url = self._build_pdf_api_url(statement_id, image_id)
-                    pdf_data = self.fetch_payslip_pdf(pdf_url)
-                    if pdf_data:
-                        pdf_path = self._make_file_path(pay_date, "pdf")
-                        pdf_path.parent.mkdir(parents=True, exist_ok=True)
-                        pdf_path.write_bytes(pdf_data)
-                        pdf_rel_path = str(pdf_path.relative_to(self.CACHE_DIR))
-
-                # Update index
-                json_rel_path = str(json_path.relative_to(self.CACHE_DIR))
-                self.index.mark_cached(encoded_id, pay_date, json_rel_path, pdf_rel_path)
-
-                newly_downloaded += 1
-                status = "OK" if pdf_rel_path or skip_pdf else "OK (no PDF)"
-                print(f" {status}")
-
-            except RuntimeError as e:
-                if "401" in str(e) or "expired" in str(e).lower():
-                    # Save progress before raising
-                    print(" FAILED (session expired)")
-                    print()
-                    print("Session expired. Saving progress...")
-                    self.index.save()
-                    raise
-                print(f" FAILED: {e}")
-
-            time.sleep(self.delay_seconds)
+                # The index is only updated here, on the main thread
+                for future in as_completed(futures):
+                    i, kind = futures[future]
+                    meta = missing[i]
+
+                    result: Any
+                    try:
+                        result = future.result()
+                    except RuntimeError as e:
+                        if kind == "json" and (
+                            "401" in str(e) or "expired" in str(e).lower()
+                        ):
+                            # Save progress before raising
+                            print(f"  {meta.pay_date}... FAILED (session expired)")
+                            print()
+                            print("Session expired. Saving progress...")
+                            self.index.save()
+                            raise
+                        result = e
+
+                    got = results.setdefault(i, {})
+                    got[kind] = result
+                    if len(got) < parts[i]:
+                        continue
+                    del results[i]
+
+                    finished += 1
+                    progress = f"  [{finished}/{len(missing)}] {meta.pay_date}..."
+                    if isinstance(got["json"], RuntimeError):
+                        print(f"{progress} FAILED: {got['json']}")
+                        continue
+
+                    pdf, notes = got.get("pdf", (None, ""))
+                    if isinstance(pdf, RuntimeError):
+                        pdf, notes = None, f" (PDF error: {str(pdf)[:50]})"
+                    pdf_rel_path, pdf_hash = pdf or (None, None)
+                    self.index.mark_cached(
+                        meta.encoded_id,
+                        meta.pay_date,
+                        got["json"],
+                        pdf_rel_path,
+                        statement_id=meta.statement_id,
+                        image_id=meta.image_id,
+                        pdf_hash=pdf_hash,
+                    )
+
+                    newly_downloaded += 1
+                    status = "OK" if pdf or skip_pdf else "OK (no PDF)"
+                    print(f"{progress}{notes} {status}")
+            finally:
+                _cancel_pending(futures)
 
         # Save final index
         self.index.save()
@@ -627,17 +1045,25 @@ class PayslipSyncer:
 
         payslips = self.list_all_payslips()
         for ps in payslips:
-            # Get the base64 encoded ID (what we store in index)
-            encoded_id = self._get_encoded_id(ps)
-
-            # Get the statement ID and image ID from statementImageUri
-            statement_id, image_id = self._get_pdf_info(ps)
-            if statement_id and image_id:
-                id_map[encoded_id] = (statement_id, image_id)
+            # Keyed by the base64 encoded ID (what we store in index), with
+            # the statement ID and image ID from statementImageUri
+            meta = self._extract_meta(ps)
+            if meta.statement_id and meta.image_id:
+                id_map[meta.encoded_id] = (meta.statement_id, meta.image_id)
 
         print(f"  Found PDF info for {len(id_map)} payslips")
         return id_map
 
+    def _pdf_ids_from_detail(self, json_path: str | None) -> tuple[str | None, str | None]:
+        """Look for the statementImageUri in a cached payslip detail JSON."""
+        if not json_path:
+            return None, None
+        try:
+            detail = fast_json_loads((self.CACHE_DIR / json_path).read_bytes())
+        except (ValueError, OSError):
+            return None, None
+        return _pdf_ids(_find_key(detail, "statementImageUri"))
+
     def sync_pdfs_only(self) -> tuple[int, int, int]:
         """
         Download PDFs for cached payslips that are missing them.
@@ -655,90 +1081,211 @@ class PayslipSyncer:
             print("No cached payslips found. Run without --pdf-only first.")
             return 0, 0, 0
 
-        # Find entries missing PDFs
+        # Find entries missing PDFs, or whose PDF no longer matches the hash
+        # taken when it was downloaded
         missing_pdf = []
+        damaged = 0
         for encoded_id, info in all_cached.items():
             pdf_path = info.get("pdf_path")
-            if pdf_path:
-                # Check if PDF file actually exists
-                full_path = self.CACHE_DIR / pdf_path
-                if full_path.exists():
+            # Check if PDF file actually exists
+            if pdf_path and self.index.has_file(pdf_path):
+                pdf_hash = info.get("pdf_hash")
+                if not pdf_hash or _file_hash(self.CACHE_DIR / pdf_path) == pdf_hash:
                     continue
+                damaged += 1
             missing_pdf.append((encoded_id, info))
 
         already_have_pdf = total_cached - len(missing_pdf)
         print(f"  Already have PDF: {already_have_pdf}")
         print(f"  Missing PDF: {len(missing_pdf)}")
+        if damaged:
+            print(f"    (of which damaged: {damaged})")
 
         if not missing_pdf:
             print()
             print("All cached payslips already have PDFs!")
             return total_cached, already_have_pdf, 0
 
-        # Query API to get the correct statement IDs for PDF downloads
+        # Use the statement IDs recorded in the index or found in the cached
+        # detail JSON; only query the API for the full list if some are left
         print()
-        pdf_id_map = self._get_pdf_statement_ids()
+        pdf_id_map: dict[str, tuple[str, str]] = {}
+        for encoded_id, info in missing_pdf:
+            statement_id, image_id = info.get("statement_id"), info.get("image_id")
+            if not (statement_id and image_id):
+                statement_id, image_id = self._pdf_ids_from_detail(info.get("json_path"))
+                if statement_id and image_id:
+                    self.index.set_pdf_ids(encoded_id, statement_id, image_id)
+            if statement_id and image_id:
+                pdf_id_map[encoded_id] = (statement_id, image_id)
+        print(f"  PDF info already known for {len(pdf_id_map)} payslips")
+
+        if len(pdf_id_map) < len(missing_pdf):
+            for encoded_id, ids in self._get_pdf_statement_ids().items():
+                if encoded_id not in pdf_id_map and encoded_id in all_cached:
+                    pdf_id_map[encoded_id] = ids
+                    self.index.set_pdf_ids(encoded_id, *ids)
 
         # Download missing PDFs
         print()
-        print("Downloading missing PDFs...")
+        print(f"Downloading missing PDFs ({self.workers} at a time)...")
         newly_downloaded = 0
+        done = 0
 
-        for i, (encoded_id, info) in enumerate(missing_pdf):
-            pay_date = info.get("pay_date", "unknown")
+        def progress(pay_date: str) -> str:
+            nonlocal done
+            done += 1
+            return f"  [{done}/{len(missing_pdf)}] {pay_date}..."
 
-            print(f"  [{i + 1}/{len(missing_pdf)}] {pay_date}...", end="", flush=True)
+        self._make_dirs(info.get("pay_date", "unknown") for _, info in missing_pdf)
 
-            try:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures: dict[Future, tuple[str, str]] = {}
+            for encoded_id, info in missing_pdf:
+                pay_date = info.get("pay_date", "unknown")
                 # Get the correct statement ID and image ID from the API response
                 if encoded_id not in pdf_id_map:
-                    print(" SKIP (no PDF info from API)")
+                    print(f"{progress(pay_date)} SKIP (no PDF info from API)")
                     continue
-
                 statement_id, image_id = pdf_id_map[encoded_id]
+                future = executor.submit(self._download_pdf, pay_date, statement_id, image_id)
+                futures[future] = (encoded_id, pay_date)
 
-                # Build PDF URL and download
-                pdf_url = self._build_pdf_api_url(statement_id, image_id)
-                pdf_data = self.fetch_payslip_pdf(pdf_url)
+            try:
+                for future in as_completed(futures):
+                    encoded_id, pay_date = futures[future]
+                    line = progress(pay_date)
+
+                    try:
+                        pdf, notes = future.result()
+                    except Exception as e:
+                        error_msg = str(e)[:40]
+                        print(f"{line} ERROR: {error_msg}")
+                        continue
+
+                    if pdf:
+                        # Update index with PDF path and hash
+                        self.index.set_pdf_path(encoded_id, *pdf)
+                        newly_downloaded += 1
+                        print(f"{line}{notes} OK")
+                    else:
+                        print(f"{line}{notes} FAILED")
+            finally:
+                _cancel_pending(futures)
+
+        # Save updated index
+        self.index.save()
 
-                if pdf_data:
-                    pdf_path = self._make_file_path(pay_date, "pdf")
-                    pdf_path.parent.mkdir(parents=True, exist_ok=True)
-                    pdf_path.write_bytes(pdf_data)
-                    pdf_rel_path = str(pdf_path.relative_to(self.CACHE_DIR))
+        return total_cached, already_have_pdf, newly_downloaded
 
-                    # Update index with PDF path
-                    self.index._data["payslips"][encoded_id]["pdf_path"] = pdf_rel_path
-                    newly_downloaded += 1
-                    print(" OK")
-                else:
-                    print(" FAILED")
 
-            except Exception as e:
-                error_msg = str(e)[:40]
-                print(f" ERROR: {error_msg}")
+@functools.cache
+def _month_dir(cache_dir: Path, pay_date: str) -> Path:
+    """
+    The year/month directory for a pay date. Cached, as payslips share
+    dates and each date is looked up for both its JSON and PDF.
+    """
+    # Parse the date (ignoring any time part) to extract year and month
+    try:
+        dt = datetime.fromisoformat(pay_date[:10])
+    except ValueError:
+        return cache_dir / "unknown" / "unknown"
+    return cache_dir / str(dt.year) / f"{dt.month:02d}"
 
-            time.sleep(self.delay_seconds)
 
-        # Save updated index
-        self.index.save()
+def _pdf_hasher() -> Any:
+    """The content hash recorded for downloaded PDFs."""
+    return hashlib.blake2b(digest_size=32)
 
-        return total_cached, already_have_pdf, newly_downloaded
+
+def _file_hash(path: Path) -> str:
+    """Hash an existing file the same way PDFs are hashed while downloading."""
+    hasher = _pdf_hasher()
+    with open(path, "rb") as f:
+        while chunk := f.read(PayslipSyncer.PDF_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _write_durable(path: Path, data: bytes) -> None:
+    """
+    Replace path with data atomically: written to a temporary file and
+    fsynced before the rename, so neither an interrupted write nor a crash
+    can leave a truncated or empty file behind.
+    """
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def _href(uri: Any) -> str | None:
+    """Return the href of a URI field, given as {"href": ...} or a plain string."""
+    return uri.get("href") if isinstance(uri, dict) else uri
+
+
+def _pdf_ids(statement_image_uri: Any) -> tuple[str | None, str | None]:
+    """
+    Extract BOTH statement_id AND image_id from a statementImageUri.
+
+    Format: /v1_0/O/A/payStatement/{statement_id}/images/{image_id}.pdf
+    """
+    href = _href(statement_image_uri)
+    match = STATEMENT_IMAGE_HREF_RE.search(href) if href else None
+    if not match:
+        return None, None
+    statement_id, filename = match.groups()
+    return statement_id, filename[:-4] if filename.endswith(".pdf") else None
+
+
+def _find_key(data: Any, key: str) -> Any:
+    """Return the first value stored under key anywhere in nested JSON data."""
+    values: Iterable[Any]
+    if isinstance(data, dict):
+        if key in data:
+            return data[key]
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _iter_chunks(response: Any, chunk_size: int) -> Iterator[bytes]:
+    """Iterate a streamed requests or httpx response body."""
+    if hasattr(response, "iter_content"):
+        return response.iter_content(chunk_size)
+    return response.iter_bytes(chunk_size)
+
+
+def _cancel_pending(futures: dict[Future, Any]) -> None:
+    """Drop downloads that haven't started, e.g. after the session expired."""
+    for future in futures:
+        future.cancel()
 
 
 def list_cached_payslips(cache_dir: Path) -> None:
     """Display a summary of cached payslips."""
     index = PayslipIndex(cache_dir)
-    index.load()
-
+    index.load(read_only=True)
     payslips = index.get_all()
+    last_sync = index.last_sync
+    index.close()
+
     if not payslips:
         print("No cached payslips found.")
         return
 
     print(f"Cached payslips: {len(payslips)}")
-    if index.last_sync:
-        print(f"Last sync: {index.last_sync}")
+    if last_sync:
+        print(f"Last sync: {last_sync}")
     print()
 
     # Group by year
@@ -794,6 +1341,17 @@ def main() -> int:
         action="store_true",
         help="List cached payslips and exit",
     )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Fetch payslip details and PDFs over HTTP/2 (requires httpx[http2])",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=PayslipSyncer.DEFAULT_WORKERS,
+        help=f"Payslips to download at once (default: {PayslipSyncer.DEFAULT_WORKERS})",
+    )
     args = parser.parse_args()
 
     print("Payslip Sync")
@@ -808,7 +1366,7 @@ def main() -> int:
     # Handle cache options
     if args.clear_cache:
         cache = SessionCache(verbose=True)
-        cache.clear()
+        cache.clear(include_profile=True)
         print()
 
     use_cache = not args.no_cache
@@ -832,6 +1390,7 @@ def main() -> int:
     print()
 
     # Run sync with context manager to ensure browser cleanup
+    syncer: PayslipSyncer | None = None
     try:
         # Pass browser context only if we need PDFs and have a live browser
         browser_context = auth_result.browser_context if need_browser else None
@@ -844,6 +1403,8 @@ def main() -> int:
         syncer = PayslipSyncer(
             session=auth_result.session,
             browser_context=browser_context,
+            workers=args.workers,
+            http2=args.http2,
         )
 
         if args.pdf_only:
@@ -877,7 +1438,9 @@ def main() -> int:
         print("\n\nInterrupted by user. Progress has been saved.")
         return 1
     finally:
-        # Clean up browser resources
+        # Clean up HTTP/2 connections and browser resources
+        if syncer:
+            syncer.close()
         auth_result.close_browser()
 
 
@@ -5,6 +5,8 @@
 #   "playwright",
 #   "playwright-stealth",
 #   "python-dotenv",
+#   "orjson",
+#   "brotli",
 # ]
 # ///
 """
@@ -23,19 +25,38 @@ Options:
     --visible       Show browser window during authentication
     --clear-cache   Clear cached session and force fresh authentication
     --no-cache      Skip session cache entirely
+    --concurrency N Max employee cards fetched in parallel (default: 8)
+    --rate R        Cap requests per second (default: paced by server headers)
+    --http2         Send requests over HTTP/2 (requires httpx[http2])
 """
 
 import argparse
 import csv
-import json
+import os
+import sqlite3
 import sys
-import time
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 import requests
 
-from ihcm_auth import create_authenticated_session_playwright
+from ihcm_auth import (
+    HTTPX_AVAILABLE,
+    RateLimiter,
+    ThreadSessions,
+    create_authenticated_session_playwright,
+    create_session_h2,
+    fast_json_dumps,
+    fast_json_loads,
+    looks_like_html,
+    sync_cookies_from_h2,
+    use_rate_limiter,
+)
 
 
 class PeopleHomeExtractor:
@@ -45,14 +66,28 @@ class PeopleHomeExtractor:
     The directory API supports pagination but lacks HR fields. The employee-card
     API has the HR fields but requires individual requests per employee.
 
-    Employee card responses are cached to `.cache/employee_cards/` to avoid
-    re-fetching on subsequent runs (useful when sessions expire mid-extraction).
+    Employee card responses are cached in `.cache/employee_cards.sqlite` to
+    avoid re-fetching on subsequent runs (useful when sessions expire
+    mid-extraction). Cards cached as one JSON file each in
+    `.cache/employee_cards/` by earlier versions are imported once.
     """
 
     EMPLOYEE_API = 'https://ihcm.adp.com/whrmux/webapi/api/employee'
     CARD_API = 'https://ihcm.adp.com/whrmux/webapi/api/employee-card'
+    CACHE_DB = Path('.cache/employee_cards.sqlite')
+    # Per-employee JSON files, the card cache before CACHE_DB
     CACHE_DIR = Path('.cache/employee_cards')
 
+    # HR fields taken from the employee card, keyed by the field they fill
+    CARD_FIELDS = {
+        'employeeCode': 'EMPLOYEECODE',
+        'referenceNumber': 'REFERENCENUMBER',
+        'status': 'STATUS',
+    }
+
+    # Throttled (429) requests are retried this many times, paced by the limiter
+    MAX_THROTTLE_RETRIES = 3
+
     CSV_FIELDS = [
         'id',
         'fullName',
@@ -77,13 +112,112 @@ class PeopleHomeExtractor:
         self,
         session: requests.Session,
         batch_size: int = 100,
-        delay_seconds: float = 0.1,
         enrich_with_card: bool = True,
+        concurrency: int = 8,
+        limiter: RateLimiter | None = None,
+        http2: bool = False,
     ):
         self.session = session
+        # Page and card workers each send through their own copy of the
+        # session, so their rotating session cookies don't overwrite one another
+        self._sessions = ThreadSessions(session)
         self.batch_size = batch_size
-        self.delay_seconds = delay_seconds
         self.enrich_with_card = enrich_with_card
+        self.concurrency = max(1, concurrency)
+        # Paced by the server's rate limit headers rather than a fixed delay
+        self.limiter = limiter or RateLimiter(max_concurrency=self.concurrency)
+        # Page and card workers each number `concurrency`, but the limiter
+        # bounds how many requests are in flight at once - keep that many
+        # connections warm so none is torn down and re-handshaked. 429s are
+        # left to the limiter rather than retried inside urllib3.
+        in_flight = self.limiter.max_concurrency
+        use_rate_limiter(session, in_flight)
+        # With http2, all workers share one multiplexed connection instead.
+        # The client is built on the first request so it picks up the
+        # session's latest cookies, and hands them back on close().
+        if http2 and not HTTPX_AVAILABLE:
+            raise RuntimeError("httpx is not installed. Install with:\n  uv pip install 'httpx[http2]'")
+        self.http2 = http2
+        self.client: Any = None
+        self._client_lock = threading.Lock()
+        # Directory size reported by the first page of the latest iter_all()
+        self.total = 0
+        # False if the latest iter_all() was cut short (see its docstring)
+        self.complete = True
+        # Cards read from cache / fetched / not needed by the latest iter_all()
+        self.cards_cached = 0
+        self.cards_fetched = 0
+        self.cards_inline = 0
+        # Progress goes to stderr so it stays out of redirected output; on a
+        # terminal it is redrawn on one line instead of a line per page
+        self._live_progress = sys.stderr.isatty()
+        self._db = self._open_cache()
+
+    def _open_cache(self) -> sqlite3.Connection:
+        """Open the card cache, importing the old per-employee JSON files on first use."""
+        self.CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.CACHE_DB)
+        db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS cards (id TEXT PRIMARY KEY, card_json TEXT NOT NULL);
+            """
+        )
+
+        has_rows = db.execute('SELECT 1 FROM cards LIMIT 1').fetchone()
+        if not has_rows and self.CACHE_DIR.is_dir():
+            with os.scandir(self.CACHE_DIR) as entries:
+                files = [entry for entry in entries if entry.name.endswith('.json')]
+            with db:
+                db.executemany(
+                    'INSERT OR REPLACE INTO cards VALUES (?, ?)',
+                    ((entry.name[:-5], Path(entry.path).read_bytes()) for entry in files),
+                )
+        return db
+
+    def close(self) -> None:
+        """Close the card cache and the HTTP/2 client, if one was opened."""
+        self._db.close()
+        self._sessions.merge()
+        if self.client:
+            sync_cookies_from_h2(self.client, self.session)
+            self.client.close()
+
+    def _http2_client(self) -> Any:
+        """Return the HTTP/2 client, copying the session's cookies on first use."""
+        with self._client_lock:
+            if self.client is None:
+                self.client = create_session_h2(self.session, self.limiter.max_concurrency)
+            return self.client
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """
+        Send a request through the rate limiter, over HTTP/2 when enabled,
+        retrying throttled (429) responses.
+
+        Returns a requests or httpx response; callers only use the attributes
+        the two have in common.
+        """
+        for attempt in range(self.MAX_THROTTLE_RETRIES + 1):
+            self.limiter.wait()
+            try:
+                if self.http2:
+                    response = self._http2_client().request(method, url, **kwargs)
+                else:
+                    response = self._sessions.get().request(method, url, **kwargs)
+            except Exception:
+                self.limiter.update(None)
+                raise
+            self.limiter.update(response)
+
+            if response.status_code != 429 or attempt == self.MAX_THROTTLE_RETRIES:
+                break
+            # The limiter already honours Retry-After; back off anyway without one
+            if 'Retry-After' not in response.headers:
+                self.limiter.pause(2 ** attempt)
+
+        return response
 
     def fetch_employee_batch(self, start: int) -> tuple[list[dict], int]:
         """Fetch a batch of employees from the directory API."""
@@ -97,7 +231,7 @@ class PeopleHomeExtractor:
             'showParameterics': False,
         }
 
-        response = self.session.post(self.EMPLOYEE_API, json=payload)
+        response = self._request('POST', self.EMPLOYEE_API, json=payload)
 
         if response.status_code == 401:
             raise RuntimeError(
@@ -108,159 +242,329 @@ class PeopleHomeExtractor:
         if response.status_code != 200:
             raise RuntimeError(f'API returned status {response.status_code}: {response.text[:200]}')
 
-        if response.text.strip().startswith('<!'):
+        if looks_like_html(response):
             raise RuntimeError('Session expired - received login page.')
 
-        result = response.json()
+        result = fast_json_loads(response.content)
         return result.get('data', []), result.get('total', 0)
 
-    def fetch_employee_card(self, people_id: str) -> tuple[dict, bool]:
-        """Fetch additional HR fields for a single employee.
+    def cached_card_count(self) -> int:
+        """Number of employee cards in the cache."""
+        return self._db.execute('SELECT COUNT(*) FROM cards').fetchone()[0]
 
-        Returns a tuple of (card_data, was_cached) where card_data contains the
-        HR fields and was_cached indicates whether the data came from cache.
-        The full API response is cached to disk for future runs.
+    def _cached_cards(self, people_ids: list[str]) -> dict[str, dict]:
+        """The cached cards among people_ids, keyed by people ID, from a single query."""
+        if not people_ids:
+            return {}
+        placeholders = ','.join('?' * len(people_ids))
+        rows = self._db.execute(f'SELECT id, card_json FROM cards WHERE id IN ({placeholders})', people_ids)
+        return {people_id: fast_json_loads(card_json) for people_id, card_json in rows}
+
+    def _fetch_card(self, people_id: str) -> dict | None:
         """
-        cache_file = self.CACHE_DIR / f'{people_id}.json'
-        if cache_file.exists():
-            card = json.loads(cache_file.read_text())
-            return {
-                'employeeCode': card.get('EMPLOYEECODE'),
-                'referenceNumber': card.get('REFERENCENUMBER'),
-                'status': card.get('STATUS'),
-            }, True
+        Fetch the full employee-card record from the API, or None if there is
+        none. Doesn't touch the cache, so it's safe to call from worker threads.
 
-        response = self.session.get(f'{self.CARD_API}?peopleId={people_id}')
+        One request per employee: the endpoint has no known bulk form (see
+        CLAUDE.md), so throughput comes from fetching cards concurrently.
+        """
+        response = self._request('GET', self.CARD_API, params={'peopleId': people_id})
 
         if response.status_code != 200:
-            return {}, False
+            return None
 
-        if response.text.strip().startswith('<!'):
+        if looks_like_html(response):
             raise RuntimeError('Session expired - received login page.')
 
         try:
-            data = response.json()
-        except requests.exceptions.JSONDecodeError:
-            print(f'  Warning: Empty response for {people_id}')
-            return {}, False
-
-        if not data:
-            return {}, False
+            data = fast_json_loads(response.content)
+        except ValueError:
+            self._warn(f'  Warning: Empty response for {people_id}')
+            return None
+
+        return data[0] if data else None
+
+    def _store_cards(self, cards: dict[str, dict]) -> None:
+        """Cache fetched cards, keyed by people ID, in a single transaction."""
+        if not cards:
+            return
+        with self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO cards VALUES (?, ?)',
+                [(people_id, fast_json_dumps(card)) for people_id, card in cards.items()],
+            )
 
-        card = data[0]
+    @classmethod
+    def _card_fields(cls, card: dict) -> dict:
+        """The HR fields added to an employee from their card."""
+        return {field: card.get(card_key) for field, card_key in cls.CARD_FIELDS.items()}
 
-        cache_file.parent.mkdir(parents=True, exist_ok=True)
-        cache_file.write_text(json.dumps(card, indent=2))
+    @classmethod
+    def _promote_inline_fields(cls, emp: dict) -> bool:
+        """
+        Fill in the card's HR fields from the directory record itself, if it
+        carries all of them under the card's own keys (EMPLOYEECODE etc.).
+        Returns True if it did, so the card needn't be fetched.
+        """
+        if any(emp.get(card_key) is None for card_key in cls.CARD_FIELDS.values()):
+            return False
+        emp.update(cls._card_fields(emp))
+        return True
 
-        return {
-            'employeeCode': card.get('EMPLOYEECODE'),
-            'referenceNumber': card.get('REFERENCENUMBER'),
-            'status': card.get('STATUS'),
-        }, False
+    def fetch_employee_card(self, people_id: str) -> tuple[dict, bool]:
+        """Fetch additional HR fields for a single employee.
 
-    def extract_all(self) -> list[dict]:
-        """Extract all employees with optional enrichment from employee-card API."""
-        all_employees = []
-        start = 0
-        total = None
+        Returns a tuple of (card_data, was_cached) where card_data contains the
+        HR fields and was_cached indicates whether the data came from cache.
+        The full API response is cached for future runs.
+        """
+        cached = self._cached_cards([people_id])
+        if cached:
+            return self._card_fields(cached[people_id]), True
 
-        print(f'Starting extraction with batch size {self.batch_size}...')
-        print()
+        card = self._fetch_card(people_id)
+        if card is None:
+            return {}, False
 
-        # Phase 1: Fetch all employees from directory API
-        while True:
-            batch, reported_total = self.fetch_employee_batch(start)
+        self._store_cards({people_id: card})
+        return self._card_fields(card), False
 
-            if total is None:
-                total = reported_total
-                print(f'Total employees to extract: {total:,}')
-                print()
+    def _enrich_batch(self, batch: list[dict], executor: ThreadPoolExecutor) -> None:
+        """
+        Add employee-card fields to each employee in batch, in place.
+        Employees whose directory record already has them are skipped. The
+        batch's cached cards are read in one query on this thread, counting
+        cache hits as they're applied; only the misses go to the executor,
+        and their results are merged here as they complete.
+
+        Fetched cards are cached in one transaction per batch - including when
+        the batch is cut short, so cards already merged are kept.
+        """
+        futures: dict[Future, dict] = {}
+        fetched: dict[str, dict] = {}
+        try:
+            needed = [emp for emp in batch if not self._promote_inline_fields(emp)]
+            self.cards_inline += len(batch) - len(needed)
+
+            cached = self._cached_cards([emp['id'] for emp in needed])
+            for emp in needed:
+                card = cached.get(emp['id'])
+                if card is not None:
+                    emp.update(self._card_fields(card))
+                    self.cards_cached += 1
+                else:
+                    futures[executor.submit(self._fetch_card, emp['id'])] = emp
+
+            for future in as_completed(futures):
+                emp = futures[future]
+                card = future.result()
+                if card is not None:
+                    fetched[emp['id']] = card
+                    emp.update(self._card_fields(card))
+                self.cards_fetched += 1
+        except BaseException:
+            # Don't start cards that are still queued, e.g. after the session expired
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            self._store_cards(fetched)
+
+    def _iter_pages(self) -> Iterator[list[dict]]:
+        """
+        Yield directory pages in order. The first page tells us the total (set
+        as self.total), so every later offset is known up front and those
+        pages are requested concurrently, up to `concurrency` ahead of the
+        page being yielded.
+
+        If a page comes back short - the directory changed underneath us, so
+        later offsets would be misaligned - the requests after it are dropped
+        and the rest of the directory is read serially from there.
+        """
+        first, total = self.fetch_employee_batch(0)
+        self.total = total
+        print(f'Total employees to extract: {total:,}')
+        print()
 
-            if not batch:
-                break
+        if not first:
+            return
+        yield first
 
-            all_employees.extend(batch)
+        # Later pages step by what the server actually returned per page
+        step = start = len(first)
+        offsets = iter(range(step, total, step))
+        pending: deque[tuple[int, Future]] = deque()
 
-            progress = len(all_employees)
-            pct = (progress / total * 100) if total > 0 else 0
-            print(f'  Directory: {progress:,} / {total:,} ({pct:.1f}%)')
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            def fill() -> None:
+                while len(pending) < self.concurrency:
+                    offset = next(offsets, None)
+                    if offset is None:
+                        return
+                    pending.append((offset, executor.submit(self.fetch_employee_batch, offset)))
 
-            if progress >= total:
+            try:
+                fill()
+                while pending:
+                    offset, future = pending.popleft()
+                    batch = future.result()[0]
+                    if not batch:
+                        return
+                    fill()
+                    yield batch
+                    start = offset + len(batch)
+                    if len(batch) < step and start < total:
+                        break
+            finally:
+                # Don't wait on pages nobody will read, e.g. after an interrupt
+                for _, later in pending:
+                    later.cancel()
+
+        while start < total:
+            batch = self.fetch_employee_batch(start)[0]
+            if not batch:
                 break
-
+            yield batch
             start += len(batch)
-            time.sleep(self.delay_seconds)
 
-        print()
-        print(f'Directory extraction complete: {len(all_employees):,} employees')
+    def iter_all(self) -> Iterator[dict]:
+        """
+        Yield every employee, with optional enrichment from the employee-card
+        API, page by page as the directory is read - so callers can write
+        records out as they arrive rather than holding the whole directory.
+
+        Employees are yielded once each: if pages overlap because the
+        directory changed mid-run, repeated IDs are dropped before their
+        cards are looked up.
+
+        If the session expires or the run is interrupted while enriching, the
+        rest of the directory is still listed and yielded without card data,
+        so a partial run saves every employee. If the directory itself can't
+        be read any further, iteration stops there. Either way self.complete
+        is left False.
+        """
+        count = 0
+        seen: set[str] = set()
+        duplicates = 0
+        enrich = self.enrich_with_card
+        self.complete = True
+        self.cards_cached = self.cards_fetched = self.cards_inline = 0
 
-        # Phase 2: Enrich with employee-card data
+        print(f'Starting extraction with batch size {self.batch_size}...')
         if self.enrich_with_card:
-            print()
-            cached_count = sum(1 for e in all_employees if (self.CACHE_DIR / f'{e["id"]}.json').exists())
-            if cached_count > 0:
+            cached_count = self.cached_card_count()
+            if cached_count:
                 print(f'Found {cached_count:,} cached employee cards.')
-                print('Enriching with employee-card data...')
-            else:
-                print('Enriching with employee-card data (this takes ~20 minutes)...')
-            print()
-
-            cached = 0
-            fetched = 0
-            enriched = 0
-
-            try:
-                for i, emp in enumerate(all_employees):
-                    card_data, was_cached = self.fetch_employee_card(emp['id'])
-                    emp.update(card_data)
-                    enriched = i + 1
-
-                    if was_cached:
-                        cached += 1
-                    else:
-                        fetched += 1
-                        time.sleep(self.delay_seconds)
-
-                    if (i + 1) % 100 == 0 or i == len(all_employees) - 1:
-                        pct = ((i + 1) / len(all_employees) * 100)
-                        print(f'  Cards: {i + 1:,} / {len(all_employees):,} ({pct:.1f}%) '
-                              f'[cached: {cached:,}, fetched: {fetched:,}]')
-
-                print()
-                print('Enrichment complete.')
-
-            except (RuntimeError, KeyboardInterrupt) as e:
-                print()
-                print(f'Interrupted: {e}')
-                print(f'Saving partial results ({enriched:,} of {len(all_employees):,} enriched)...')
-                print('Re-run with fresh credentials to continue from cache.')
-
-        return all_employees
-
-
-def export_to_json(employees: list[dict], filepath: Path) -> None:
-    """Export employee data to a JSON file."""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(
-            {
-                'exported_at': datetime.now().isoformat(),
-                'total_count': len(employees),
-                'employees': employees,
-            },
-            f,
-            indent=2,
-            ensure_ascii=False,
-        )
-    print(f'Exported to JSON: {filepath}')
+            print(f'Enriching with employee-card data, {self.concurrency} requests at a time...')
+        print()
 
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pages = self._iter_pages()
+            while True:
+                try:
+                    page = next(pages, None)
+                except (RuntimeError, requests.RequestException, KeyboardInterrupt) as e:
+                    self._end_progress()
+                    print(f'Directory listing stopped: {e}')
+                    print(f'Saving the {count:,} of {self.total:,} employees listed so far...')
+                    self.complete = False
+                    break
+                if page is None:
+                    break
+
+                batch = []
+                for emp in page:
+                    if emp['id'] not in seen:
+                        seen.add(emp['id'])
+                        batch.append(emp)
+                duplicates += len(page) - len(batch)
+
+                if enrich:
+                    try:
+                        self._enrich_batch(batch, executor)
+                    except (RuntimeError, requests.RequestException, KeyboardInterrupt) as e:
+                        self._end_progress()
+                        print(f'Interrupted: {e}')
+                        print('Listing the rest of the directory without card data...')
+                        print('Re-run with fresh credentials to continue from cache.')
+                        enrich = False
+                        self.complete = False
+
+                yield from batch
+                count += len(batch)
+
+                self._print_progress(count)
+
+        self._end_progress()
+        if duplicates:
+            print(f'Dropped {duplicates:,} duplicate employee records')
+        if self.cards_inline:
+            print(f'Skipped card fetch for {self.cards_inline:,} employees with inline HR fields')
+        if self.complete:
+            print(f'Extraction complete: {count:,} employees')
+        else:
+            enriched = self.cards_cached + self.cards_fetched + self.cards_inline
+            print(f'Extraction incomplete: {count:,} of {self.total:,} employees'
+                  + (f', {enriched:,} enriched' if self.enrich_with_card else ''))
+
+    def _print_progress(self, count: int) -> None:
+        pct = (count / self.total * 100) if self.total > 0 else 0
+        cards = (f' [cards cached: {self.cards_cached:,}, fetched: {self.cards_fetched:,}]'
+                 if self.enrich_with_card else '')
+        line = f'  Employees: {count:,} / {self.total:,} ({pct:.1f}%){cards}'
+        if self._live_progress:
+            print(f'\r{line}', end='', file=sys.stderr, flush=True)
+        else:
+            print(line, file=sys.stderr)
+
+    def _end_progress(self) -> None:
+        """Finish the live progress line so the next message starts on its own."""
+        if self._live_progress:
+            print(file=sys.stderr)
+
+    def _warn(self, message: str) -> None:
+        """Print a warning from a worker thread on its own line, clear of the progress line."""
+        print(('\n' if self._live_progress else '') + message, file=sys.stderr)
+
+
+def export_employees(employees: Iterable[dict], json_path: Path, csv_path: Path, fields: list[str],
+                     is_complete: Callable[[], bool] | None = None) -> int:
+    """
+    Stream employees to a pretty-printed JSON file and a CSV file as they
+    arrive, so memory stays bounded by the page size rather than the
+    directory size. Returns the number of employees written.
 
-def export_to_csv(employees: list[dict], filepath: Path, fields: list[str]) -> None:
-    """Export employee data to a CSV file."""
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
-        writer.writeheader()
-        writer.writerows(employees)
-    print(f'Exported to CSV: {filepath}')
+    Both files are written under a .partial name and only renamed into place
+    once every employee has been written. If is_complete is given, it is
+    checked after the last employee and recorded as "complete" in the JSON.
+    """
+    json_tmp = json_path.with_name(json_path.name + '.partial')
+    csv_tmp = csv_path.with_name(csv_path.name + '.partial')
+    count = 0
+
+    with open(json_tmp, 'wb') as json_file, open(csv_tmp, 'w', newline='', encoding='utf-8') as csv_file:
+        json_file.write(b'{\n  "exported_at": ' + fast_json_dumps(datetime.now().isoformat()) + b',\n  "employees": [')
+        writer = csv.writer(csv_file)
+        writer.writerow(fields)
+
+        for employee in employees:
+            # Indent each record to its depth inside the employees array
+            record = fast_json_dumps(employee, indent=True).replace(b'\n', b'\n    ')
+            json_file.write((b',\n    ' if count else b'\n    ') + record)
+            # A plain row rather than DictWriter's per-row field checks; missing fields are left blank
+            writer.writerow([employee.get(field, '') for field in fields])
+            count += 1
+
+        trailer = f',\n  "total_count": {count}'
+        if is_complete is not None:
+            trailer += f',\n  "complete": {"true" if is_complete() else "false"}'
+        json_file.write((b'\n  ]' if count else b']') + (trailer + '\n}').encode())
+
+    json_tmp.replace(json_path)
+    csv_tmp.replace(csv_path)
+    print(f'Exported to JSON: {json_path}')
+    print(f'Exported to CSV: {csv_path}')
+    return count
 
 
 def test_connection(session: requests.Session) -> bool:
@@ -279,19 +583,21 @@ def test_connection(session: requests.Session) -> bool:
             print(f'Directory API failed: {response.status_code}')
             return False
 
-        if response.text.strip().startswith('<!'):
+        if looks_like_html(response):
             print('Session expired - received login page.')
             return False
 
-        data = response.json()
+        data = fast_json_loads(response.content)
         print(f'Directory API: {data.get("total", 0):,} total employees')
 
         # Test employee-card API
         if data.get('data'):
             emp_id = data['data'][0]['id']
-            card_resp = session.get(f'https://ihcm.adp.com/whrmux/webapi/api/employee-card?peopleId={emp_id}')
-            if card_resp.status_code == 200 and card_resp.json():
-                card = card_resp.json()[0]
+            card_resp = session.get(PeopleHomeExtractor.CARD_API, params={'peopleId': emp_id})
+            # Parsed once, for both the emptiness check and the sample
+            cards = fast_json_loads(card_resp.content) if card_resp.status_code == 200 else None
+            if cards:
+                card = cards[0]
                 print(f'Employee-card API: OK (sample: code={card.get("EMPLOYEECODE")})')
             else:
                 print('Employee-card API: Failed or empty')
@@ -312,6 +618,12 @@ def main():
     parser.add_argument('--visible', action='store_true', help='Show browser during authentication')
     parser.add_argument('--clear-cache', action='store_true', help='Clear cached session before auth')
     parser.add_argument('--no-cache', action='store_true', help='Skip session cache entirely')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Max employee cards fetched in parallel (default: 8, 1 = serial)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Cap requests per second (default: paced by server headers only)')
+    parser.add_argument('--http2', action='store_true',
+                        help='Send requests over one multiplexed HTTP/2 connection (requires httpx[http2])')
     args = parser.parse_args()
 
     print('iHCM People Home Extractor')
@@ -322,7 +634,7 @@ def main():
     if args.clear_cache:
         from ihcm_auth import SessionCache
         cache = SessionCache(verbose=True)
-        cache.clear()
+        cache.clear(include_profile=True)
         print()
 
     use_cache = not args.no_cache
@@ -350,24 +662,34 @@ def main():
     print('-' * 50)
     print()
 
-    extractor = PeopleHomeExtractor(
-        session,
-        batch_size=100,
-        delay_seconds=0.1,
-        enrich_with_card=True,
-    )
-
-    employees = extractor.extract_all()
+    concurrency = max(1, args.concurrency)
+    try:
+        extractor = PeopleHomeExtractor(
+            session,
+            batch_size=100,
+            enrich_with_card=True,
+            concurrency=concurrency,
+            limiter=RateLimiter(max_concurrency=concurrency, requests_per_second=args.rate),
+            http2=args.http2,
+        )
+    except RuntimeError as e:
+        # e.g. --http2 without httpx installed
+        print(f'Error: {e}')
+        sys.exit(1)
 
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     json_path = Path(f'people_home_{timestamp}.json')
     csv_path = Path(f'people_home_{timestamp}.csv')
 
-    print()
-    print('Exporting data...')
-    export_to_json(employees, json_path)
-    export_to_csv(employees, csv_path, PeopleHomeExtractor.CSV_FIELDS)
-
+    try:
+        # Employees are written out as they're enriched rather than collected first
+        export_employees(extractor.iter_all(), json_path, csv_path, PeopleHomeExtractor.CSV_FIELDS,
+                         is_complete=lambda: extractor.complete)
+    finally:
+        extractor.close()
+
+    if not extractor.complete:
+        print('Warning: the export is partial (marked "complete": false in the JSON)')
     print()
     print('Done!')
 